@@ -0,0 +1,299 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compact Beam coder for the per-sample elements passed between stages.
+
+Sample*, Compute*Metrics and ConvertToTorchGeoDataParDo pass dicts holding a
+dataset dataclass (StochasticBlockModel, NodeClassificationDataset,
+LinkPredictionDataset, ...) with graph_tool graphs, numpy arrays and
+edge-feature dicts. Pickling them walks every edge tuple of the feature dict
+and every graph_tool object. SampleElementCoder writes them as raw buffers:
+
+  element:  b"GWEL" | version (u8) | num_items (u32) | (key, value)*
+  value:    kind (u8) | payload
+    array:      dtype (str) | ndim (u8) | shape (i64 * ndim) | zero padding
+                to a 16-byte offset | C-order bytes
+    graph:      directed (u8) | num_vertices (i64) | (num_edges, 2) edge array
+    edge dict:  (n, 2) key array | (n, ...) stacked value array
+    dataclass:  "module:qualname" (str) | num_fields (u16) | (name, value)*
+    list:       length (u32) | value*
+    str:        str
+    None, Ellipsis: no payload
+    anything else: pickle (u64 length | bytes)
+
+where str is a u16 length followed by UTF-8 bytes. Decoded arrays share one
+writable copy of the encoded buffer instead of being copied one by one, so
+any decoded array keeps the whole buffer alive. graph_tool graphs are rebuilt
+from their vertex count and edge list, in graph.get_edges() order; property
+maps are not kept. Edge-feature dict values come back as rows of one stacked
+array.
+
+Use with beam.ParDo(...).with_output_types(SampleElement), or the opt-in
+--element_coder=compact flag of the pipeline.
+"""
+
+import dataclasses
+import functools
+import importlib
+import io
+import pickle
+import struct
+
+import apache_beam as beam
+import graph_tool
+import numpy as np
+
+_ELEMENT_MAGIC = b"GWEL"
+_VERSION = 1
+
+_NONE = 0
+_ELLIPSIS = 1
+_ARRAY = 2
+_GRAPH = 3
+_EDGE_DICT = 4
+_DATACLASS = 5
+_LIST = 6
+_STR = 7
+_PICKLE = 8
+
+# Array data starts at multiples of this offset, so decoded arrays are aligned.
+_ALIGNMENT = 16
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_I64 = struct.Struct("<q")
+
+
+class SampleElement(dict):
+    """Type hint of the per-sample dicts, bound to SampleElementCoder."""
+
+
+def _WriteStr(out, value):
+    encoded = value.encode()
+    out.write(_U16.pack(len(encoded)))
+    out.write(encoded)
+
+
+def _WriteArray(out, array):
+    if not array.flags.c_contiguous:
+        array = array.copy(order="C")
+    _WriteStr(out, array.dtype.str)
+    out.write(_U8.pack(array.ndim))
+    out.write(struct.pack("<%dq" % array.ndim, *array.shape))
+    out.write(bytes(-out.tell() % _ALIGNMENT))
+    out.write(memoryview(array.reshape(-1).view(np.uint8)))
+
+
+def _EdgeDictArrays(value):
+    """Returns (keys, values) arrays of an edge-feature dict, or None.
+
+    Only dicts whose values are all arrays of at least one dimension qualify,
+    so their decoded values are arrays again (rows of the stacked array).
+    """
+    if not value or not isinstance(next(iter(value)), tuple):
+        return None
+    if not all(
+        isinstance(features, np.ndarray) and features.ndim
+        for features in value.values()
+    ):
+        return None
+    try:
+        keys = np.array(list(value.keys()))
+        if keys.ndim != 2 or keys.shape[1] != 2 or keys.dtype.kind not in "iu":
+            return None
+        values = np.stack(list(value.values()))
+    except (TypeError, ValueError):
+        return None
+    if values.dtype.hasobject:
+        return None
+    if keys.size and keys.min() >= 0 and keys.max() < 2**31:
+        keys = keys.astype(np.int32)
+    return keys, values
+
+
+def _WriteValue(out, value):
+    edge_arrays = _EdgeDictArrays(value) if isinstance(value, dict) else None
+    if value is None:
+        out.write(_U8.pack(_NONE))
+    elif value is Ellipsis:
+        out.write(_U8.pack(_ELLIPSIS))
+    elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        out.write(_U8.pack(_ARRAY))
+        _WriteArray(out, value)
+    elif isinstance(value, graph_tool.Graph):
+        num_vertices = value.num_vertices()
+        edges = value.get_edges()[:, :2]
+        if num_vertices < 2**31:
+            edges = edges.astype(np.int32)
+        out.write(_U8.pack(_GRAPH))
+        out.write(_U8.pack(value.is_directed()))
+        out.write(_I64.pack(num_vertices))
+        _WriteArray(out, edges)
+    elif edge_arrays is not None:
+        out.write(_U8.pack(_EDGE_DICT))
+        _WriteArray(out, edge_arrays[0])
+        _WriteArray(out, edge_arrays[1])
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        fields = dataclasses.fields(value)
+        out.write(_U8.pack(_DATACLASS))
+        _WriteStr(out, "%s:%s" % (type(value).__module__, type(value).__qualname__))
+        out.write(_U16.pack(len(fields)))
+        for field in fields:
+            _WriteStr(out, field.name)
+            _WriteValue(out, getattr(value, field.name))
+    elif type(value) is str:
+        out.write(_U8.pack(_STR))
+        _WriteStr(out, value)
+    elif type(value) is list:
+        out.write(_U8.pack(_LIST))
+        out.write(_U32.pack(len(value)))
+        for item in value:
+            _WriteValue(out, item)
+    else:
+        pickled = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        out.write(_U8.pack(_PICKLE))
+        out.write(_U64.pack(len(pickled)))
+        out.write(pickled)
+
+
+@functools.lru_cache(maxsize=None)
+def _ResolveClass(name):
+    module_name, qualname = name.split(":")
+    cls = importlib.import_module(module_name)
+    for attribute in qualname.split("."):
+        cls = getattr(cls, attribute)
+    return cls
+
+
+class _Reader:
+    """Reads values back from a writable buffer."""
+
+    def __init__(self, encoded):
+        self._buffer = memoryview(bytearray(encoded))
+        self._position = 0
+
+    def Unpack(self, fmt):
+        values = fmt.unpack_from(self._buffer, self._position)
+        self._position += fmt.size
+        return values[0] if len(values) == 1 else values
+
+    def Bytes(self, size):
+        start = self._position
+        self._position += size
+        return self._buffer[start : self._position]
+
+    def Str(self):
+        return bytes(self.Bytes(self.Unpack(_U16))).decode()
+
+    def Array(self):
+        dtype = np.dtype(self.Str())
+        ndim = self.Unpack(_U8)
+        shape = struct.unpack_from("<%dq" % ndim, self._buffer, self._position)
+        self._position += 8 * ndim
+        self._position += -self._position % _ALIGNMENT
+        count = int(np.prod(shape, dtype=np.int64))
+        array = np.frombuffer(
+            self._buffer, dtype=dtype, count=count, offset=self._position
+        )
+        self._position += count * dtype.itemsize
+        return array.reshape(shape)
+
+    def Value(self):
+        kind = self.Unpack(_U8)
+        if kind == _NONE:
+            return None
+        if kind == _ELLIPSIS:
+            return Ellipsis
+        if kind == _ARRAY:
+            return self.Array()
+        if kind == _GRAPH:
+            directed = bool(self.Unpack(_U8))
+            num_vertices = self.Unpack(_I64)
+            graph = graph_tool.Graph(directed=directed)
+            graph.add_vertex(num_vertices)
+            graph.add_edge_list(self.Array())
+            return graph
+        if kind == _EDGE_DICT:
+            keys = self.Array()
+            values = self.Array()
+            return dict(zip(map(tuple, keys.tolist()), values))
+        if kind == _DATACLASS:
+            cls = _ResolveClass(self.Str())
+            value = cls.__new__(cls)
+            for _ in range(self.Unpack(_U16)):
+                name = self.Str()
+                object.__setattr__(value, name, self.Value())
+            return value
+        if kind == _LIST:
+            return [self.Value() for _ in range(self.Unpack(_U32))]
+        if kind == _STR:
+            return self.Str()
+        if kind == _PICKLE:
+            return pickle.loads(self.Bytes(self.Unpack(_U64)))
+        raise ValueError("Unknown value kind %d in encoded element" % kind)
+
+
+def encode_element(element) -> bytes:
+    """Encodes a per-sample dict (or any value) in the compact format."""
+    out = io.BytesIO()
+    out.write(_ELEMENT_MAGIC)
+    out.write(_U8.pack(_VERSION))
+    if isinstance(element, dict):
+        out.write(_U32.pack(len(element)))
+        for key, value in element.items():
+            _WriteValue(out, key)
+            _WriteValue(out, value)
+    else:
+        out.write(_U32.pack(0xFFFFFFFF))
+        _WriteValue(out, element)
+    return out.getvalue()
+
+
+def decode_element(encoded: bytes):
+    """Inverse of encode_element; dicts come back as SampleElement."""
+    if encoded[:4] != _ELEMENT_MAGIC:
+        raise ValueError("Not an encoded graph_world element")
+    reader = _Reader(encoded)
+    reader.Bytes(len(_ELEMENT_MAGIC))
+    version = reader.Unpack(_U8)
+    if version != _VERSION:
+        raise ValueError("Unsupported element encoding version %d" % version)
+    num_items = reader.Unpack(_U32)
+    if num_items == 0xFFFFFFFF:
+        return reader.Value()
+    element = SampleElement()
+    for _ in range(num_items):
+        key = reader.Value()
+        element[key] = reader.Value()
+    return element
+
+
+class SampleElementCoder(beam.coders.Coder):
+    """Beam coder writing per-sample elements with encode_element."""
+
+    def encode(self, value):
+        return encode_element(value)
+
+    def decode(self, encoded):
+        return decode_element(encoded)
+
+    def is_deterministic(self):
+        return False
+
+    def to_type_hint(self):
+        return SampleElement
+
+
+beam.coders.registry.register_coder(SampleElement, SampleElementCoder)
@@ -0,0 +1,140 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Round trips of per-sample elements through the compact coder."""
+
+import unittest
+
+import numpy as np
+
+from graph_world.beam.coders import (
+    decode_element,
+    encode_element,
+    SampleElement,
+    SampleElementCoder,
+)
+from graph_world.generators.sbm_simulator import (
+    MakePi,
+    MakePropMat,
+    SimulateEdgeFeatures,
+    SimulateFeatures,
+    SimulateSbm,
+    StochasticBlockModel,
+)
+from graph_world.nodeclassification.utils import NodeClassificationDataset
+
+
+def _SimulateSbmData(edge_features_as_array=False, backend="graph_tool"):
+    rng = np.random.default_rng(7)
+    sbm_data = StochasticBlockModel()
+    SimulateSbm(
+        sbm_data,
+        num_vertices=60,
+        num_edges=240,
+        pi=MakePi(3, 0.5),
+        prop_mat=MakePropMat(3, 4.0),
+        backend=backend,
+        rng=rng,
+    )
+    SimulateFeatures(sbm_data, center_var=1.0, feature_dim=4, num_groups=3, rng=rng)
+    SimulateEdgeFeatures(
+        sbm_data,
+        feature_dim=2,
+        center_distance=1.0,
+        as_array=edge_features_as_array,
+        rng=rng,
+    )
+    return sbm_data
+
+
+def _Element(data):
+    return {
+        "sample_id": 3,
+        "marginal_param": "nvertex",
+        "fixed_params": {"avg_degree": 8.0},
+        "generator_config": {"nvertex": 60, "generator_name": "SBM"},
+        "data": data,
+    }
+
+
+class SampleElementCoderTest(unittest.TestCase):
+    def assertValuesEqual(self, expected, actual):
+        if isinstance(expected, np.ndarray):
+            self.assertIsInstance(actual, np.ndarray)
+            self.assertEqual(expected.dtype, actual.dtype)
+            np.testing.assert_array_equal(expected, actual)
+        elif isinstance(expected, dict):
+            self.assertEqual(sorted(expected), sorted(actual))
+            for key in expected:
+                self.assertValuesEqual(expected[key], actual[key])
+        elif hasattr(expected, "get_edges"):
+            self.assertEqual(expected.is_directed(), actual.is_directed())
+            self.assertEqual(expected.num_vertices(), actual.num_vertices())
+            np.testing.assert_array_equal(expected.get_edges(), actual.get_edges())
+        else:
+            self.assertEqual(type(expected), type(actual))
+            self.assertEqual(expected, actual)
+
+    def assertRoundTrips(self, element):
+        decoded = decode_element(encode_element(element))
+        self.assertIsInstance(decoded, SampleElement)
+        self.assertEqual(list(element), list(decoded))
+        for key, value in element.items():
+            if key != "data":
+                self.assertValuesEqual(value, decoded[key])
+        data = element["data"]
+        self.assertIs(type(data), type(decoded["data"]))
+        for name in data.__dataclass_fields__:
+            self.assertValuesEqual(getattr(data, name), getattr(decoded["data"], name))
+        return decoded
+
+    def testStochasticBlockModelWithEdgeFeatureDict(self):
+        self.assertRoundTrips(_Element(_SimulateSbmData()))
+
+    def testStochasticBlockModelWithEdgeFeatureArray(self):
+        self.assertRoundTrips(_Element(_SimulateSbmData(edge_features_as_array=True)))
+
+    def testStochasticBlockModelWithoutGraph(self):
+        decoded = self.assertRoundTrips(_Element(_SimulateSbmData(backend="numpy")))
+        self.assertIsNone(decoded["data"].graph)
+
+    def testNodeClassificationDataset(self):
+        sbm_data = _SimulateSbmData()
+        data = NodeClassificationDataset(
+            graph=sbm_data.graph,
+            graph_memberships=sbm_data.graph_memberships,
+            node_features=sbm_data.node_features,
+            feature_memberships=sbm_data.feature_memberships,
+            edge_features=sbm_data.edge_features,
+        )
+        self.assertRoundTrips(_Element(data))
+
+    def testScalarEdgeFeatureDictKeepsPythonFloats(self):
+        edge_features = {(0, 1): 0.5, (1, 2): 1.5}
+        decoded = decode_element(encode_element({"edge_features": edge_features}))
+        self.assertValuesEqual(edge_features, decoded["edge_features"])
+        for value in decoded["edge_features"].values():
+            self.assertIs(type(value), float)
+
+    def testCoderDecodesWhatItEncodes(self):
+        coder = SampleElementCoder()
+        element = _Element(_SimulateSbmData())
+        decoded = coder.decode(coder.encode(element))
+        self.assertEqual(element["sample_id"], decoded["sample_id"])
+        self.assertEqual(
+            element["data"].graph.num_edges(), decoded["data"].graph.num_edges()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
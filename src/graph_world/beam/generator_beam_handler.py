@@ -16,6 +16,8 @@ from abc import ABC, abstractmethod
 
 import gin
 
+from ..beam.fused_par_do import FusedBenchmarkParDo
+
 
 class GeneratorBeamHandler(ABC):
 
@@ -45,6 +47,36 @@ class GeneratorBeamHandler(ABC):
     def SetOutputPath(self, output_path):
         pass
 
+    # Raises ValueError unless the handler has the metrics, convert and
+    # benchmark stages that every pipeline --benchmark_layout except "none"
+    # runs. Call after SetOutputPath, which builds some of them.
+    def CheckBenchmarkStages(self):
+        missing = [
+            name
+            for name, par_do in [
+                ("GetGraphMetricsParDo", self.GetGraphMetricsParDo()),
+                ("GetConvertParDo", self.GetConvertParDo()),
+                ("GetBenchmarkParDo", self.GetBenchmarkParDo()),
+            ]
+            if par_do is None
+        ]
+        if missing:
+            raise ValueError(
+                "%s cannot run the benchmark stages: %s returned None. Use "
+                "--benchmark_layout=none to only sample graphs for this task."
+                % (type(self).__name__, ", ".join(missing))
+            )
+
+    # Metrics, conversion and benchmarking of each sample in a single DoFn.
+    # Call after SetOutputPath, which configures the chained DoFns.
+    def GetFusedBenchmarkParDo(self):
+        self.CheckBenchmarkStages()
+        return FusedBenchmarkParDo(
+            self.GetGraphMetricsParDo(),
+            self.GetConvertParDo(),
+            self.GetBenchmarkParDo(),
+        )
+
 
 @gin.configurable
 class GeneratorBeamHandlerWrapper:
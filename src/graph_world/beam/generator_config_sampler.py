@@ -41,28 +41,35 @@ class GeneratorConfigSampler:
     #   self._AddSampleFn('foo', self._SampleUniformInteger)
     #   self._AddSampleFn('bar', self._SampleUniformFloat)
     # The sampler_fn can also be any function accessible to the child class.
+    # SampleConfig passes its optional np.random.Generator to sampler_fns as
+    # the `rng` keyword, so make custom sampler_fns accept it to be seedable.
     #
     # Arguments:
     #   param_sampler_specs: a list of ParamSamplerSpecs.
 
-    def _SampleUniformInteger(self, param_sampler):
+    def _SampleUniformInteger(self, param_sampler, rng=None):
         low = int(param_sampler.min_val)
         high = int(param_sampler.max_val)
         if high < low:
             raise RuntimeError(
                 "integer sampling for %s failed as high < low" % param_sampler.name
             )
-        return low if low == high else np.random.randint(low, high)
+        if low == high:
+            return low
+        if rng is None:
+            return np.random.randint(low, high)
+        return int(rng.integers(low, high))
 
-    def _SampleUniformFloat(self, param_sampler):
-        return np.random.uniform(param_sampler.min_val, param_sampler.max_val)
+    def _SampleUniformFloat(self, param_sampler, rng=None):
+        uniform = np.random.uniform if rng is None else rng.uniform
+        return uniform(param_sampler.min_val, param_sampler.max_val)
 
     def _AddSamplerFn(self, param_name, sampler_fn):
         if param_name not in self._param_sampler_specs:
             raise RuntimeError("param %s not found in input param specs" % param_name)
         self._param_sampler_specs[param_name].sampler_fn = sampler_fn
 
-    def _ChooseMarginalParam(self):
+    def _ChooseMarginalParam(self, rng=None):
         valid_params = [
             param_name
             for param_name, spec in self._param_sampler_specs.items()
@@ -70,16 +77,30 @@ class GeneratorConfigSampler:
         ]
         if len(valid_params) == 0:
             return None
-        return random.choice(valid_params)
+        if rng is None:
+            return random.choice(valid_params)
+        return valid_params[rng.integers(len(valid_params))]
 
     def __init__(self, param_sampler_specs):
         self._param_sampler_specs = {spec.name: spec for spec in param_sampler_specs}
 
-    def SampleConfig(self, marginal=False):
+    def SampleConfig(
+        self, marginal=False, rng=None, config_filter=None, max_resamples=0
+    ):
+        # Samples a config. If config_filter is given, configs it rejects are
+        # resampled up to max_resamples times; the last sample is returned even
+        # if rejected, so callers that must not proceed should check it again.
+        for _ in range(max_resamples):
+            sample = self._SampleConfigOnce(marginal, rng)
+            if config_filter is None or config_filter(sample[0]):
+                return sample
+        return self._SampleConfigOnce(marginal, rng)
+
+    def _SampleConfigOnce(self, marginal, rng):
         config = {}
         marginal_param = None
         if marginal:
-            marginal_param = self._ChooseMarginalParam()
+            marginal_param = self._ChooseMarginalParam(rng)
         fixed_params = []
         for param_name, spec in self._param_sampler_specs.items():
             param_value = None
@@ -91,6 +112,9 @@ class GeneratorConfigSampler:
                         param_value = spec.default_val
             # If the param val is still None, give it a random value.
             if param_value is None:
-                param_value = spec.sampler_fn(spec)
+                if rng is None:
+                    param_value = spec.sampler_fn(spec)
+                else:
+                    param_value = spec.sampler_fn(spec, rng=rng)
             config[param_name] = param_value
         return config, marginal_param, fixed_params
@@ -24,8 +24,11 @@ import pandas as pd
 from apache_beam.options.pipeline_options import PipelineOptions, SetupOptions
 
 # Generator-agnostic imports
+from ..beam.coders import SampleElement
+from ..beam.fused_par_do import SKIPPED_TAG
 from ..beam.generator_beam_handler import GeneratorBeamHandlerWrapper
 from ..beam.generator_config_sampler import ParamSamplerSpec
+from ..beam.results_io import WriteResultsToParquet
 from .task_benchmarkers import *
 
 from ..graphregression.beam_handler import GraphRegressionBeamHandler
@@ -69,6 +72,44 @@ def entry(argv=None):
         help="Whether to write sampled graph data. Saves CPU and disk if disabled.",
     )
 
+    parser.add_argument(
+        "--benchmark_layout",
+        dest="benchmark_layout",
+        default="none",
+        choices=["none", "unfused", "fused"],
+        help=(
+            "Stages run after sampling. 'none' only samples (and writes); "
+            "'unfused' runs graph metrics, torchgeo conversion and benchmarking "
+            "as separate Beam stages; 'fused' runs all three per sample in one "
+            "DoFn, keeping graphs in-process. Both write results.ndjson."
+        ),
+    )
+
+    parser.add_argument(
+        "--element_coder",
+        dest="element_coder",
+        default="pickle",
+        choices=["compact", "pickle"],
+        help=(
+            "How sampled graphs are serialized between Beam stages. 'pickle' "
+            "uses Beam's default pickling. 'compact' (opt-in) writes graphs and "
+            "arrays as raw buffers, dropping graph_tool property maps (see "
+            "beam/coders.py)."
+        ),
+    )
+
+    parser.add_argument(
+        "--results_format",
+        dest="results_format",
+        default="ndjson",
+        choices=["ndjson", "parquet", "both"],
+        help=(
+            "Format of the benchmark results: sharded results.ndjson, "
+            "results-*.parquet (needs pyarrow; see beam/results_io.py for "
+            "loading and ndjson export), or both."
+        ),
+    )
+
     args, pipeline_args = parser.parse_known_args(argv)
     sys.stdout.flush()
     print(f"Pipeline Args: {pipeline_args}", flush=True)
@@ -80,35 +121,64 @@ def entry(argv=None):
     gen_handler_wrapper = GeneratorBeamHandlerWrapper()
     gen_handler_wrapper.SetOutputPath(args.output)
 
+    # Fail before sampling if the task cannot run the requested stages.
+    if args.benchmark_layout != "none":
+        gen_handler_wrapper.handler.CheckBenchmarkStages()
+
+    def ElementParDo(do_fn):
+        par_do = beam.ParDo(do_fn)
+        if args.element_coder == "compact":
+            par_do = par_do.with_output_types(SampleElement)
+        return par_do
+
     with beam.Pipeline(options=pipeline_options) as p:
         graph_samples = (
             p
             | "Create Sample Ids" >> beam.Create(range(gen_handler_wrapper.nsamples))
-            | "Sample Graphs" >> beam.ParDo(gen_handler_wrapper.handler.GetSampleDoFn())
+            | "Sample Graphs"
+            >> ElementParDo(gen_handler_wrapper.handler.GetSampleDoFn())
         )
         if args.write_samples:
             graph_samples | "Write Sampled Graph" >> beam.ParDo(
                 gen_handler_wrapper.handler.GetWriteDoFn()
             )
 
-        # pdb.set_trace()
-        # torch_data = (
-        #     graph_samples
-        #     | "Compute graph metrics."
-        #     >> beam.ParDo(gen_handler_wrapper.handler.GetGraphMetricsParDo())
-        #     | "Convert to torchgeo data."
-        #     >> beam.ParDo(gen_handler_wrapper.handler.GetConvertParDo())
-        # )
-        # pdb.set_trace()
-        # (torch_data | 'Filter skipped conversions' >> beam.Filter(
-        #     lambda el: el['skipped'])
-        #  | 'Extract skipped sample ids' >> beam.Map(lambda el: el['sample_id'])
-        #  | 'Write skipped text file' >> beam.io.WriteToText(
-        #         os.path.join(args.output, 'skipped.txt')))
-
-        # dataframe_rows = (
-        #     torch_data | 'Benchmark Simple GCN.' >> beam.ParDo(
-        #     gen_handler_wrapper.handler.GetBenchmarkParDo()))
-
-        # dataframe_rows | 'Write JSON' >> beam.io.WriteToText(
-        #     os.path.join(args.output, 'results.ndjson'), num_shards=10)
+        if args.benchmark_layout == "none":
+            return
+
+        handler = gen_handler_wrapper.handler
+        if args.benchmark_layout == "fused":
+            fused_outputs = graph_samples | "Metrics, convert and benchmark" >> (
+                beam.ParDo(handler.GetFusedBenchmarkParDo()).with_outputs(
+                    SKIPPED_TAG, main="results"
+                )
+            )
+            dataframe_rows = fused_outputs.results
+            skipped_sample_ids = fused_outputs[SKIPPED_TAG]
+        else:
+            torch_data = graph_samples | "Compute graph metrics." >> ElementParDo(
+                handler.GetGraphMetricsParDo()
+            )
+            torch_data = torch_data | "Convert to torchgeo data." >> ElementParDo(
+                handler.GetConvertParDo()
+            )
+            skipped_sample_ids = (
+                torch_data
+                | "Filter skipped conversions" >> beam.Filter(lambda el: el["skipped"])
+                | "Extract skipped sample ids" >> beam.Map(lambda el: el["sample_id"])
+            )
+            dataframe_rows = torch_data | "Benchmark Simple GCN." >> beam.ParDo(
+                handler.GetBenchmarkParDo()
+            )
+
+        skipped_sample_ids | "Write skipped text file" >> beam.io.WriteToText(
+            os.path.join(args.output, "skipped.txt")
+        )
+        if args.results_format in ("ndjson", "both"):
+            dataframe_rows | "Write JSON" >> beam.io.WriteToText(
+                os.path.join(args.output, "results.ndjson"), num_shards=10
+            )
+        if args.results_format in ("parquet", "both"):
+            dataframe_rows | "Write Parquet" >> WriteResultsToParquet(
+                os.path.join(args.output, "results"), num_shards=10
+            )
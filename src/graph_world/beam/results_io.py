@@ -0,0 +1,293 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Columnar (Parquet) storage of benchmark results.
+
+BenchmarkGNNParDo yields one JSON object per sample. WriteResultsToParquet
+stores those rows as sharded Parquet files that share one schema:
+
+  * one column per key seen in any row, sorted by name;
+  * bool, int64, float64 and string columns for keys whose values are all of
+    that type (ints and floats together make a float64 column);
+  * keys with lists, dicts or mixed types become string columns holding each
+    value's JSON encoding, listed in the schema metadata;
+  * a key missing from a row is null in its column.
+
+load_results reads them back with column projection, and export_ndjson
+writes them as results.ndjson-style lines for tools that expect those.
+pyarrow is only needed by this module.
+"""
+
+import json
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import apache_beam as beam
+from apache_beam.io.filesystems import FileSystems
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only the Parquet results format needs pyarrow.
+    pa = None
+    pq = None
+
+_JSON_COLUMNS_KEY = b"graph_world.json_columns"
+
+# Column kinds, see _ColumnKind.
+_BOOL = "bool"
+_INT = "int"
+_FLOAT = "float"
+_STRING = "string"
+_JSON = "json"
+
+
+def _RequirePyarrow():
+    if pa is None:
+        raise ImportError(
+            "The Parquet results format needs pyarrow (pip install pyarrow)."
+        )
+
+
+def _ValueType(value) -> str:
+    if isinstance(value, bool):
+        return _BOOL
+    if isinstance(value, int):
+        return _INT
+    if isinstance(value, float):
+        return _FLOAT
+    if isinstance(value, str):
+        return _STRING
+    return _JSON
+
+
+def _ColumnKind(value_types) -> str:
+    """Kind of a column whose non-null values have the given _ValueTypes."""
+    value_types = set(value_types)
+    if value_types <= {_INT, _FLOAT} and value_types:
+        return _FLOAT if _FLOAT in value_types else _INT
+    if len(value_types) == 1 and _JSON not in value_types:
+        return next(iter(value_types))
+    return _JSON
+
+
+class _ColumnTypesCombineFn(beam.CombineFn):
+    """Collects the value types of every key of the result rows."""
+
+    def create_accumulator(self):
+        return {}
+
+    def add_input(self, accumulator, row):
+        for key, value in row.items():
+            types = accumulator.setdefault(key, set())
+            if value is not None:
+                types.add(_ValueType(value))
+        return accumulator
+
+    def merge_accumulators(self, accumulators):
+        merged = {}
+        for accumulator in accumulators:
+            for key, types in accumulator.items():
+                merged.setdefault(key, set()).update(types)
+        return merged
+
+    def extract_output(self, accumulator):
+        return sorted((key, _ColumnKind(types)) for key, types in accumulator.items())
+
+
+def results_schema(columns: Sequence) -> "pa.Schema":
+    """Returns the Parquet schema of (name, kind) columns.
+
+    Arguments:
+      columns: (name, kind) pairs, kind one of "bool", "int", "float",
+        "string" and "json", as _ColumnTypesCombineFn outputs them.
+    Returns:
+      pyarrow schema with the JSON-encoded column names in its metadata.
+    """
+    _RequirePyarrow()
+    arrow_types = {
+        _BOOL: pa.bool_(),
+        _INT: pa.int64(),
+        _FLOAT: pa.float64(),
+        _STRING: pa.string(),
+        _JSON: pa.string(),
+    }
+    json_columns = [name for name, kind in columns if kind == _JSON]
+    return pa.schema(
+        [pa.field(name, arrow_types[kind]) for name, kind in columns],
+        metadata={_JSON_COLUMNS_KEY: json.dumps(json_columns).encode()},
+    )
+
+
+def _JsonColumns(schema) -> List[str]:
+    metadata = schema.metadata or {}
+    return json.loads(metadata.get(_JSON_COLUMNS_KEY, b"[]").decode())
+
+
+def rows_to_table(rows: Sequence[Dict], schema) -> "pa.Table":
+    """Builds a table of result rows (dicts) with the given results_schema."""
+    _RequirePyarrow()
+    json_columns = _JsonColumns(schema)
+    if json_columns:
+        rows = [dict(row) for row in rows]
+        for row in rows:
+            for name in json_columns:
+                if name in row:
+                    row[name] = json.dumps(row[name])
+    return pa.Table.from_pylist(rows, schema=schema)
+
+
+def _SampleOrder(row):
+    sample_id = row.get("sample_id")
+    if isinstance(sample_id, int):
+        return 0, sample_id
+    return 1, 0
+
+
+class _WriteParquetShardDoFn(beam.DoFn):
+    def __init__(self, file_path_prefix, num_shards, row_group_size):
+        self._file_path_prefix = file_path_prefix
+        self._num_shards = num_shards
+        self._row_group_size = row_group_size
+
+    def process(self, shard, columns):
+        shard_index, rows = shard
+        rows = sorted(rows, key=_SampleOrder)
+        schema = results_schema(columns)
+        path = "%s-%05d-of-%05d.parquet" % (
+            self._file_path_prefix,
+            shard_index,
+            self._num_shards,
+        )
+        with FileSystems.create(path, "application/octet-stream") as f:
+            with pq.ParquetWriter(f, schema) as writer:
+                for start in range(0, len(rows), self._row_group_size):
+                    writer.write_table(
+                        rows_to_table(
+                            rows[start : start + self._row_group_size], schema
+                        )
+                    )
+        yield path
+
+
+class WriteResultsToParquet(beam.PTransform):
+    """Writes JSON result rows to <prefix>-SSSSS-of-NNNNN.parquet files.
+
+    All shards share the schema of results_schema over every row. Empty
+    shards are not written.
+    """
+
+    def __init__(self, file_path_prefix, num_shards=10, row_group_size=10000):
+        """
+        Args:
+          file_path_prefix: output path prefix, e.g. <output>/results.
+          num_shards: number of Parquet files.
+          row_group_size: maximum rows per Parquet row group.
+        """
+        super(WriteResultsToParquet, self).__init__()
+        _RequirePyarrow()
+        self._file_path_prefix = file_path_prefix
+        self._num_shards = num_shards
+        self._row_group_size = row_group_size
+
+    def _Shard(self, row):
+        sample_id = row.get("sample_id")
+        if isinstance(sample_id, int):
+            return sample_id % self._num_shards, row
+        encoded = json.dumps(row, sort_keys=True).encode()
+        return zlib.crc32(encoded) % self._num_shards, row
+
+    def expand(self, json_rows):
+        rows = json_rows | "Parse result rows" >> beam.Map(json.loads)
+        columns = rows | "Collect result columns" >> beam.CombineGlobally(
+            _ColumnTypesCombineFn()
+        )
+        return (
+            rows
+            | "Assign result shards" >> beam.Map(self._Shard)
+            | "Group result shards" >> beam.GroupByKey()
+            | "Write Parquet shards"
+            >> beam.ParDo(
+                _WriteParquetShardDoFn(
+                    self._file_path_prefix, self._num_shards, self._row_group_size
+                ),
+                beam.pvalue.AsSingleton(columns),
+            )
+        )
+
+
+def _MatchFiles(path_pattern: str) -> List[str]:
+    metadata = FileSystems.match([path_pattern])[0].metadata_list
+    return sorted(file_metadata.path for file_metadata in metadata)
+
+
+def load_results(
+    path_pattern: str, columns: Optional[Sequence[str]] = None, to_pandas=True
+):
+    """Loads Parquet results written by WriteResultsToParquet.
+
+    Arguments:
+      path_pattern: file pattern, e.g. "<output>/results-*.parquet".
+      columns: columns to read; None reads all. Only the requested column
+        chunks are read from the files.
+      to_pandas: if True, returns a pandas DataFrame whose JSON-encoded
+        columns are decoded to Python values; else the pyarrow Table.
+    Returns:
+      pandas DataFrame or pyarrow Table with one row per result.
+    """
+    _RequirePyarrow()
+    tables = []
+    for path in _MatchFiles(path_pattern):
+        with FileSystems.open(path) as f:
+            tables.append(pq.read_table(f, columns=columns))
+    if not tables:
+        raise ValueError("No results files match %s" % path_pattern)
+    table = pa.concat_tables(tables)
+    if not to_pandas:
+        return table
+    dataframe = table.to_pandas()
+    for name in _JsonColumns(table.schema):
+        if name in dataframe.columns:
+            dataframe[name] = [
+                None if value is None else json.loads(value)
+                for value in dataframe[name]
+            ]
+    return dataframe
+
+
+def export_ndjson(path_pattern: str, output_path: str, batch_size: int = 10000):
+    """Writes Parquet results as JSON lines, one result row per line.
+
+    Each line holds the non-null columns of its row, with JSON-encoded
+    columns decoded, so it parses to the row BenchmarkGNNParDo produced (keys
+    sorted, and ints of float columns as floats).
+
+    Arguments:
+      path_pattern: file pattern of the Parquet results.
+      output_path: path of the ndjson file to write.
+      batch_size: rows converted at a time.
+    """
+    _RequirePyarrow()
+    with FileSystems.create(output_path, "text/plain") as out:
+        for path in _MatchFiles(path_pattern):
+            with FileSystems.open(path) as f:
+                parquet_file = pq.ParquetFile(f)
+                json_columns = set(_JsonColumns(parquet_file.schema_arrow))
+                for batch in parquet_file.iter_batches(batch_size=batch_size):
+                    for row in batch.to_pylist():
+                        row = {
+                            key: json.loads(value) if key in json_columns else value
+                            for key, value in row.items()
+                            if value is not None
+                        }
+                        out.write((json.dumps(row) + "\n").encode())
@@ -16,9 +16,10 @@ import collections
 
 import dataclasses
 import enum
+import itertools
 import math
 import random
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Sequence, Tuple, Union
 
 import graph_tool
 import networkx as nx
@@ -28,6 +29,7 @@ from sklearn.preprocessing import normalize
 from tqdm.notebook import tqdm
 
 from graph_tool.all import *
+from graph_world.generators import random_utils
 from graph_world.generators.sbm_simulator import (
     MatchType,
     SimulateEdgeFeatures,
@@ -45,7 +47,7 @@ class CABAM:
     graph_memberships: np.ndarray = Ellipsis
     node_features: np.ndarray = Ellipsis
     feature_memberships: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
 
 
 def NetworkxToGraphWorldData(G, node_labels, cabam_data):
@@ -62,21 +64,21 @@ def NetworkxToGraphWorldData(G, node_labels, cabam_data):
         node_labels
     )  # Memberships is integer node class list
 
-    # Manipulate G into cabam_data.graph Graph Tool object
-    nx_edges = list(G.edges())
-    nx_nodes = list(G.nodes())
+    # Manipulate G into cabam_data.graph Graph Tool object. Vertex i is the
+    # i-th node of G, so the edges are relabeled to positions and inserted
+    # in one add_edge_list call.
+    nodes = list(G.nodes())
+    num_edges = G.number_of_edges()
+    if nodes == list(range(len(nodes))):
+        endpoints = itertools.chain.from_iterable(G.edges())
+    else:
+        vertices = {node: i for i, node in enumerate(nodes)}
+        endpoints = (vertices[node] for edge in G.edges() for node in edge)
+    edges = np.fromiter(endpoints, dtype=np.int64, count=2 * num_edges)
     cabam_data.graph = graph_tool.Graph(directed=False)
-
-    # Add the nodes
-    vertices = {}  # vertex mapping for tracking edges later
-    for node in nx_nodes:
-        # Create the vertex and annotate for our edges later
-        v = cabam_data.graph.add_vertex()
-        vertices[node] = v
-    # Add the edges
-    for src, dst in nx_edges:
-        # Look up the vertex structs from our vertices mapping and add edge.
-        e = cabam_data.graph.add_edge(vertices[src], vertices[dst])
+    if nodes:
+        cabam_data.graph.add_vertex(len(nodes))
+    cabam_data.graph.add_edge_list(edges.reshape(num_edges, 2))
     return cabam_data
 
 
@@ -110,6 +112,8 @@ def GenerateCABAMGraphWithFeatures(
     edge_center_distance=0.0,
     edge_cluster_variance=1.0,
     normalize_features=True,
+    edge_features_as_array=False,
+    rng=None,
 ):
     """
     Generates Class Assortative Graphs via the Barabasi Albert Model (CABAM) with node features.
@@ -128,9 +132,16 @@ def GenerateCABAMGraphWithFeatures(
         feature_group_match_type: see sbm_simulator.MatchType.
         feature_cluster_variance: variance of feature clusters around their centers.
             centers. Increasing this weakens node feature signal.
+        edge_features_as_array: store edge features as one array aligned with
+            graph.get_edges() instead of a dict keyed by edge tuple.
+        rng: optional np.random.Generator driving the graph and all features.
+            The CABAM package only draws from the global `random` and np.random
+            states, so those are seeded from rng. If None, they are left as is.
     Returns:
         result: CABAM dataclass instance to store graph data
     """
+    if rng is not None:
+        random_utils.SeedGlobalRngs(rng)
     result = CABAM()
     CABAM_model = CABAM_git()
     G, _, node_labels, _, _ = CABAM_model.generate_graph(
@@ -153,9 +164,15 @@ def GenerateCABAMGraphWithFeatures(
         feature_group_match_type,
         feature_cluster_variance,
         normalize_features,
+        rng=rng,
     )
     SimulateEdgeFeatures(
-        result, edge_feature_dim, edge_center_distance, edge_cluster_variance
+        result,
+        edge_feature_dim,
+        edge_center_distance,
+        edge_cluster_variance,
+        as_array=edge_features_as_array,
+        rng=rng,
     )
 
     return result
@@ -11,24 +11,83 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import math
-import random
-
 import graph_tool
 import numpy as np
 
+from graph_world.generators import random_utils
+
+
+def _sample_pair_positions(num_pairs, edge_prob, rng):
+    """Samples which of num_pairs Bernoulli(edge_prob) trials succeed.
+    Gaps between successes are geometric, so they are drawn in blocks sized to
+    the expected edge count and accumulated until they run past num_pairs.
+    Args:
+      num_pairs: number of candidate pairs.
+      edge_prob: success probability of each pair.
+      rng: np.random.Generator or the np.random module.
+    Returns:
+      positions: sorted int64 array of successful pair indices.
+    """
+    if edge_prob <= 0.0 or num_pairs == 0:
+        return np.zeros(0, dtype=np.int64)
+    expected = num_pairs * edge_prob
+    block_size = int(expected + 4.0 * np.sqrt(expected) + 16)
+    blocks = []
+    last = -1
+    while last < num_pairs:
+        positions = last + np.cumsum(rng.geometric(edge_prob, size=block_size))
+        blocks.append(positions)
+        last = positions[-1]
+    positions = np.concatenate(blocks)
+    return positions[: np.searchsorted(positions, num_pairs)]
+
+
+def _pair_positions_to_edges(positions, num_vertices):
+    """Maps row-major upper-triangle pair indices to (u, v) pairs, u < v."""
+    row_starts = np.arange(num_vertices, dtype=np.int64)
+    row_starts = row_starts * (2 * num_vertices - row_starts - 1) // 2
+    u = np.searchsorted(row_starts, positions, side="right") - 1
+    v = positions - row_starts[u] + u + 1
+    return np.stack([u, v], axis=1)
+
+
+def erdos_graph_edges(num_graphs, num_vertices, edge_prob, rng=None):
+    """Generates num_graphs Erdos-Renyi G(n, p) graphs as one edge array.
+    All graphs are sampled with a single pass of geometric skips over the
+    concatenated upper triangles of their adjacency matrices.
+    Args:
+      num_graphs: number of graphs.
+      num_vertices: number of nodes in each graph.
+      edge_prob: probability of each edge.
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
+    Returns:
+      edge_index: (num_edges, 2) int64 array of edges (u, v), u < v, with node
+        ids local to their graph, sorted by graph then (u, v).
+      edge_offsets: (num_graphs + 1,) int64 array; the edges of graph i are
+        edge_index[edge_offsets[i]:edge_offsets[i + 1]].
+    """
+    rng = random_utils.GetRng(rng)
+    num_pairs = num_vertices * (num_vertices - 1) // 2
+    positions = _sample_pair_positions(num_graphs * num_pairs, edge_prob, rng)
+    graph_ids, positions = np.divmod(positions, max(num_pairs, 1))
+    edge_index = _pair_positions_to_edges(positions, num_vertices)
+    edge_offsets = np.searchsorted(graph_ids, np.arange(num_graphs + 1))
+    return edge_index, edge_offsets
+
 
-def erdos_graph(num_vertices, edge_prob):
+def erdos_graph(num_vertices, edge_prob, rng=None):
+    """Generates an Erdos-Renyi G(n, p) graph by geometric edge skipping.
+    Args:
+      num_vertices: number of nodes in the graph.
+      edge_prob: probability of each edge.
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
+    Returns:
+      g: undirected graph_tool Graph with num_vertices nodes.
+    """
+    edge_index, _ = erdos_graph_edges(1, num_vertices, edge_prob, rng)
     g = graph_tool.Graph(directed=False)
-    if edge_prob == 0.0:
-        return graph_tool.Graph(directed=False)
-    _ = g.add_vertex(num_vertices)
-    for u in range(num_vertices - 1):
-        v = u + 1
-        while v < num_vertices:
-            r = random.uniform(0.0, 1.0)
-            v = v + int(math.floor(math.log(r) / math.log(1.0 - edge_prob)))
-            if v < num_vertices:
-                g.add_edge(u, v)
-                v = v + 1
+    g.add_vertex(num_vertices)
+    g.add_edge_list(edge_index)
     return g
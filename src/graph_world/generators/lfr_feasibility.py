@@ -0,0 +1,252 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Cheap realizability checks for LFR parameters, with a persistent cache.
+
+NetworKit only finds out that an LFR parameter combination is unrealizable
+after generating degree and community sequences and trying to place every
+node, and SimulateLFRWrapper repeats that num_tries times. The estimator here
+rejects the common hopeless cases (e.g. an expected largest internal degree
+that fits in no community of the expected sizes) in O(n) NumPy work before
+NetworKit is called.
+"""
+
+import json
+import math
+import uuid
+
+import numpy as np
+from apache_beam.io.filesystems import FileSystems
+
+
+def EstimatePowerlawMinDegree(avg_deg, max_deg, exponent):
+    """Estimates the minimum degree NetworKit picks for a power law sequence.
+    LFRGenerator.generatePowerlawDegreeSequence fixes the maximum degree and
+    searches the minimum degree whose discrete power law k^exponent on
+    [min_deg, max_deg] has mean avg_deg. All candidate means are computed with
+    two suffix sums.
+    Args:
+      avg_deg: average degree.
+      max_deg: maximum degree.
+      exponent: (negative) power law exponent of the degree distribution.
+    Returns:
+      min_deg: the smallest minimum degree whose mean reaches avg_deg, or None
+        if even min_deg = max_deg falls short.
+    """
+    max_deg = int(max_deg)
+    if max_deg < 1:
+        return None
+    degrees = np.arange(1, max_deg + 1, dtype=np.float64)
+    weights = degrees**exponent
+    suffix_weights = np.cumsum(weights[::-1])[::-1]
+    suffix_moments = np.cumsum((degrees * weights)[::-1])[::-1]
+    # Means grow with the minimum degree.
+    means = suffix_moments / suffix_weights
+    index = np.searchsorted(means, avg_deg)
+    if index == max_deg:
+        return None
+    return int(degrees[index])
+
+
+def _ExpectedExtremes(low, high, exponent, draws):
+    """Expected minimum and maximum of draws samples of a discrete power law.
+    Args:
+      low: smallest value of the power law.
+      high: largest value of the power law.
+      exponent: (negative) power law exponent.
+      draws: number of independent samples.
+    Returns:
+      (expected minimum, expected maximum) of the samples.
+    """
+    values = np.arange(low, high + 1, dtype=np.float64)
+    weights = values**exponent
+    cdf = np.minimum(np.cumsum(weights) / weights.sum(), 1.0)
+    below = np.concatenate([[0.0], cdf[:-1]])
+    max_pmf = cdf**draws - below**draws
+    min_pmf = (1.0 - below) ** draws - (1.0 - cdf) ** draws
+    return float(values @ min_pmf), float(values @ max_pmf)
+
+
+def EstimateLFRFeasibility(
+    n,
+    avg_deg,
+    max_deg,
+    exponent,
+    min_community_size,
+    max_community_size,
+    community_exponent,
+    mu,
+):
+    """Checks LFR parameters (as passed to SimulateLFR) for realizability.
+    The parameters only bound the sequences NetworKit draws: n node degrees
+    from a power law on [min_deg, max_deg] and community sizes from a power
+    law on [min_community_size, max_community_size] until they cover n nodes.
+    The placement checks compare the expected extremes of those draws. A False
+    is a combination whose typical sequences cannot be placed, a True is only
+    "not obviously infeasible".
+    Args:
+      n: number of nodes
+      avg_deg: average degree
+      max_deg: maximum degree
+      exponent: power law exponent that the degree sequence should follow
+      min_community_size: minimum community size
+      max_community_size: maximum community size
+      community_exponent: power law exponent that the community sizes should
+        follow
+      mu: mixing parameter
+    Returns:
+      feasible: (bool) whether the combination may be realizable.
+      reason: (str) why it is not, or None.
+    """
+    if n < 2:
+        return False, "n must be at least 2"
+    if not 0.0 <= mu <= 1.0:
+        return False, "mu must be in [0, 1]"
+    if not 1 <= min_community_size <= max_community_size <= n:
+        return False, "need 1 <= min_community_size <= max_community_size <= n"
+    if not 1 <= avg_deg <= max_deg < n:
+        return False, "need 1 <= avg_deg <= max_deg < n"
+    min_deg = EstimatePowerlawMinDegree(avg_deg, max_deg, exponent)
+    if min_deg is None:
+        return False, "avg_deg is not reachable with this max_deg and exponent"
+    min_realized_deg, max_realized_deg = _ExpectedExtremes(
+        min_deg, max_deg, exponent, n
+    )
+    community_sizes = np.arange(
+        min_community_size, max_community_size + 1, dtype=np.float64
+    )
+    community_weights = community_sizes**community_exponent
+    mean_community_size = community_sizes @ community_weights / community_weights.sum()
+    min_community, max_community = _ExpectedExtremes(
+        min_community_size,
+        max_community_size,
+        community_exponent,
+        math.ceil(n / mean_community_size),
+    )
+    # A node needs a community with more members than its internal degree, and
+    # every community, including the smallest, must receive some nodes.
+    if (1.0 - mu) * max_realized_deg >= max_community:
+        return False, "expected largest internal degree fits in no community"
+    if (1.0 - mu) * min_realized_deg >= min_community:
+        return False, "expected smallest community fits no node"
+    return True, None
+
+
+class LFRFeasibilityCache:
+    """Persistent cache of LFR realizability, keyed on rounded parameters.
+    Each entry holds the EstimateLFRFeasibility verdict plus the observed
+    NetworKit outcomes recorded with Record(). Keys use size-free parameters
+    (ratios to n, and n rounded to two significant digits), so nearby configs
+    of a sweep share an entry.
+
+    Outcomes are shared through JSON files written with Beam's FileSystems,
+    so the cache works on local disk and on cloud storage alike. Every cache
+    instance (e.g. each copy of the generator on a worker) writes only its own
+    outcomes, to <path>-<random id>.json, and loading sums the outcomes of all
+    those files. Concurrent writers therefore never overwrite each other.
+    """
+
+    def __init__(self, path=None, decimals=2, reject_after_failures=3):
+        """
+        Args:
+          path: path prefix of the JSON files to load from and save to. If
+            None, the cache only lives in memory.
+          decimals: decimals kept when rounding the key parameters.
+          reject_after_failures: a combination with this many recorded
+            failures and no success is treated as infeasible.
+        """
+        self._path = path
+        self._decimals = decimals
+        self._reject_after_failures = reject_after_failures
+        # Estimates and outcome counts of every writer, loaded on first use.
+        self._entries = None
+        # Outcome counts recorded by this instance, written by Save().
+        self._recorded = {}
+        # Chosen on the first Save(), so pickled copies get different files.
+        self._file_id = None
+
+    def _Key(
+        self,
+        n,
+        avg_deg,
+        max_deg,
+        exponent,
+        min_community_size,
+        max_community_size,
+        community_exponent,
+        mu,
+    ):
+        rounded_n = round(n, 1 - int(math.floor(math.log10(max(n, 1)))))
+        values = (
+            avg_deg,
+            max_deg / n,
+            exponent,
+            min_community_size / n,
+            max_community_size / n,
+            community_exponent,
+            mu,
+        )
+        return json.dumps(
+            [rounded_n] + [round(float(value), self._decimals) for value in values]
+        )
+
+    def _Load(self):
+        """Sums the outcome counts of all saved files into self._entries."""
+        self._entries = {}
+        if self._path is None:
+            return
+        metadata = FileSystems.match([self._path + "-*.json"])[0].metadata_list
+        for file_metadata in metadata:
+            try:
+                with FileSystems.open(file_metadata.path) as f:
+                    counts = json.loads(f.read().decode())
+            except ValueError:  # a partially written file is skipped
+                continue
+            for key, (successes, failures) in counts.items():
+                entry = self._entries.setdefault(key, {"successes": 0, "failures": 0})
+                entry["successes"] += successes
+                entry["failures"] += failures
+
+    def _Entry(self, lfr_params):
+        if self._entries is None:
+            self._Load()
+        key = self._Key(*lfr_params)
+        entry = self._entries.setdefault(key, {"successes": 0, "failures": 0})
+        if "estimate" not in entry:
+            entry["estimate"], entry["reason"] = EstimateLFRFeasibility(*lfr_params)
+        return key, entry
+
+    def IsFeasible(self, *lfr_params):
+        """Returns whether the SimulateLFR parameters are worth attempting."""
+        _, entry = self._Entry(lfr_params)
+        if not entry["estimate"]:
+            return False
+        return entry["successes"] > 0 or entry["failures"] < self._reject_after_failures
+
+    def Record(self, success, *lfr_params):
+        """Records the outcome of a SimulateLFRWrapper call."""
+        key, entry = self._Entry(lfr_params)
+        outcome = "successes" if success else "failures"
+        entry[outcome] += 1
+        recorded = self._recorded.setdefault(key, [0, 0])
+        recorded[0 if success else 1] += 1
+
+    def Save(self):
+        """Writes the outcomes recorded by this instance, if it has a path."""
+        if self._path is None or not self._recorded:
+            return
+        if self._file_id is None:
+            self._file_id = uuid.uuid4().hex
+        path = "%s-%s.json" % (self._path, self._file_id)
+        with FileSystems.create(path, "application/json") as f:
+            f.write(json.dumps(self._recorded).encode())
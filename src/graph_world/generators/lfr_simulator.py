@@ -16,9 +16,14 @@ import collections
 
 import dataclasses
 import enum
+import functools
+import itertools
 import math
+import multiprocessing
+import multiprocessing.connection
 import random
-from typing import Dict, List, Sequence, Tuple
+import time
+from typing import Dict, List, Sequence, Tuple, Union
 
 import graph_tool
 import networkit as nk
@@ -26,7 +31,9 @@ import numpy as np
 from sklearn.preprocessing import normalize
 
 from graph_tool.all import *
+from graph_world.generators import random_utils
 from graph_world.generators.sbm_simulator import (
+    EdgeIndexToGraph,
     MatchType,
     SimulateEdgeFeatures,
     SimulateFeatures,
@@ -36,14 +43,54 @@ from graph_world.generators.sbm_simulator import (
 @dataclasses.dataclass
 class LFR:
     """
-    Stores data for the LFR Model.
+    Stores data for the LFR Model. If the graph was generated with
+    edges_only=True, graph is None and edge_index holds the (num_edges, 2)
+    edge array instead.
     """
 
     graph: graph_tool.Graph = Ellipsis
     graph_memberships: np.ndarray = Ellipsis
     node_features: np.ndarray = Ellipsis
     feature_memberships: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
+    edge_index: np.ndarray = None
+
+
+@dataclasses.dataclass
+class LFRAttempt:
+    """
+    Outcome of one SimulateLFR attempt made by SimulateLFRWrapper.
+    """
+
+    attempt: int = Ellipsis
+    seconds: float = Ellipsis
+    error: str = None
+
+
+def NetworkitToEdgeIndex(G):
+    """
+    Extracts the edge list of a NetworKit graph as a NumPy array.
+    The edges are streamed from G.iterEdges() straight into a preallocated
+    array, without building intermediate Python lists. Node ids are compacted
+    to 0..numberOfNodes()-1 in ascending order if G has deleted nodes.
+    Args:
+      G: Networkit generated LFR graph
+    Returns:
+      edge_index: (num_edges, 2) int32 array (int64 for very large graphs) of
+        undirected edges (u, v) as G.iterEdges() yields them. The endpoints of
+        a row are not reordered, so u may be larger than v.
+    """
+    num_edges = G.numberOfEdges()
+    dtype = np.int32 if G.upperNodeIdBound() <= np.iinfo(np.int32).max else np.int64
+    edge_index = np.fromiter(
+        itertools.chain.from_iterable(G.iterEdges()), dtype=dtype, count=2 * num_edges
+    ).reshape(num_edges, 2)
+    if G.numberOfNodes() != G.upperNodeIdBound():
+        node_index = np.zeros(G.upperNodeIdBound(), dtype=dtype)
+        nodes = np.fromiter(G.iterNodes(), dtype=np.int64, count=G.numberOfNodes())
+        node_index[nodes] = np.arange(nodes.shape[0])
+        edge_index = node_index[edge_index]
+    return edge_index
 
 
 def NetworkitToGraphWorldData(G):
@@ -54,16 +101,7 @@ def NetworkitToGraphWorldData(G):
     Returns:
       lfr_gt: GraphTool representation of the input graph
     """
-    nk_edges = list(G.iterEdges())
-    nk_nodes = list(G.iterNodes())
-    lfr_gt = graph_tool.Graph(directed=False)
-    vertices = {}
-    for node in nk_nodes:
-        v = lfr_gt.add_vertex()
-        vertices[node] = v
-    for src, dst in nk_edges:
-        e = lfr_gt.add_edge(vertices[src], vertices[dst])
-    return lfr_gt
+    return EdgeIndexToGraph(G.numberOfNodes(), NetworkitToEdgeIndex(G))
 
 
 def SimulateLFR(
@@ -75,6 +113,7 @@ def SimulateLFR(
     max_community_size,
     exponent_community,
     mu,
+    rng=None,
 ):
     """
     Simulates an LFR Graph using NetworKit and the sampled parameters.
@@ -87,20 +126,133 @@ def SimulateLFR(
       max_community_size: maximum community size
       exponent_community: power law exponent that the community sizes should follow
       mu: mixing parameter
+      rng: optional np.random.Generator used to seed NetworKit's RNG. If None,
+        NetworKit's current RNG state is used.
     Returns:
       lfrG: generated NetworKit LFR graph
       community_sizes: sequence of community sizes in generated graph
     """
+    if rng is not None:
+        nk.setSeed(random_utils.DrawSeed(rng), False)
     lfr = nk.generators.LFRGenerator(n)
     lfr.generatePowerlawDegreeSequence(avg_deg, max_deg, exponent)
     lfr.generatePowerlawCommunitySizeSequence(
         min_community_size, max_community_size, exponent_community
     )
     lfr.setMu(mu)
-    lfrG = lfr.generate()
+    lfr.run()
+    lfrG = lfr.getGraph()
     return lfrG, lfr
 
 
+class _FinishedLFR:
+    """What SimulateLFRWrapper callers read from an LFRGenerator that ran in a
+    worker process: its partition (LFRGenerator itself cannot be pickled)."""
+
+    def __init__(self, partition):
+        self._partition = partition
+
+    def getPartition(self):
+        return self._partition
+
+
+def _AttemptSeeds(rng, num_tries):
+    """One NetworKit seed per attempt, drawn up front so attempt i gets the
+    same seed however many attempts run at once."""
+    if rng is None:
+        return [None] * num_tries
+    return [random_utils.DrawSeed(rng) for _ in range(num_tries)]
+
+
+def _TimedSimulateLFR(attempt, simulate_fn, seed=None):
+    start = time.perf_counter()
+    try:
+        if seed is not None:
+            nk.setSeed(seed, False)
+        lfr_nk, lfr_model = simulate_fn()
+        error = None
+    except Exception as e:
+        lfr_nk, lfr_model = None, None
+        error = repr(e)
+    record = LFRAttempt(attempt, time.perf_counter() - start, error)
+    if error is not None:
+        print(
+            f"LFR graph not realizeable.. attempt: {attempt} "
+            f"({record.seconds:.2f}s): {error}"
+        )
+    return record, lfr_nk, lfr_model
+
+
+def _SimulateLFRInProcess(connection, simulate_fn, attempt, seed):
+    """Runs one attempt in its own process and sends back the graph and
+    memberships (or the failure record) through connection."""
+    # Parallel attempts each get a process, so NetworKit's OpenMP threads
+    # would only oversubscribe the cores they share.
+    nk.setNumberOfThreads(1)
+    record, lfr_nk, lfr_model = _TimedSimulateLFR(attempt, simulate_fn, seed)
+    if lfr_model is None:
+        connection.send((record, None, None))
+    else:
+        connection.send((record, lfr_nk, lfr_model.getPartition().getVector()))
+    connection.close()
+
+
+def _SimulateLFRInProcesses(simulate_fn, seeds, num_parallel_tries, ordered):
+    """Runs attempts in up to num_parallel_tries processes at a time.
+
+    Yields (record, lfr_nk, memberships) per finished attempt, in attempt order
+    if ordered and else in completion order. An attempt whose process dies
+    (NetworKit can crash on unrealizable parameters) yields a failure record.
+    Processes still running when the caller stops iterating are terminated.
+    """
+    pending = list(enumerate(seeds, start=1))
+    running = {}  # attempt -> (process, connection, start time)
+    finished = {}
+    next_attempt = 1
+    try:
+        while pending or running or finished:
+            while pending and len(running) < num_parallel_tries:
+                attempt, seed = pending.pop(0)
+                reader, writer = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=_SimulateLFRInProcess,
+                    args=(writer, simulate_fn, attempt, seed),
+                    daemon=True,
+                )
+                process.start()
+                writer.close()
+                running[attempt] = (process, reader, time.perf_counter())
+            ready = multiprocessing.connection.wait(
+                [reader for _, reader, _ in running.values()]
+            )
+            for attempt, (process, reader, start) in list(running.items()):
+                if reader not in ready:
+                    continue
+                try:
+                    finished[attempt] = reader.recv()
+                except EOFError:
+                    process.join()
+                    error = "attempt process exited with code %s" % process.exitcode
+                    print(f"LFR graph not realizeable.. attempt: {attempt}: {error}")
+                    record = LFRAttempt(attempt, time.perf_counter() - start, error)
+                    finished[attempt] = (record, None, None)
+                reader.close()
+                process.join()
+                del running[attempt]
+            if ordered:
+                while next_attempt in finished:
+                    yield finished.pop(next_attempt)
+                    next_attempt += 1
+            else:
+                for attempt in sorted(finished):
+                    yield finished.pop(attempt)
+    finally:
+        for process, reader, _ in running.values():
+            process.terminate()
+            process.join()
+            reader.close()
+
+
 def SimulateLFRWrapper(
     n,
     avg_deg,
@@ -111,6 +263,9 @@ def SimulateLFRWrapper(
     community_exponent,
     mu,
     num_tries=20,
+    rng=None,
+    num_parallel_tries=1,
+    attempt_log=None,
 ):
     """
     Simulates an LFR Graph using NetworKit and the sampled parameters.
@@ -124,25 +279,54 @@ def SimulateLFRWrapper(
       exponent_community: power law exponent that the community sizes should follow
       mu: mixing parameter
       num_tries: number of attempts at simulating LFR graph until success
+      rng: optional np.random.Generator. One NetworKit seed per attempt is
+        drawn from it up front, and the lowest-numbered successful attempt is
+        returned, so the result does not depend on num_parallel_tries.
+      num_parallel_tries: number of attempts to run at once, each in its own
+        process. Without rng the first attempt to succeed is returned. Once
+        the result is known, attempts still running are terminated.
+      attempt_log: optional list that gets one LFRAttempt per finished attempt,
+        with its wall time and error (None on success).
     Returns:
       lfrG: generated NetworKit LFR graph
       community_sizes: sequence of community sizes in generated graph
     """
-    for i in range(num_tries):
-        try:
-            lfr_nk, lfr_model = SimulateLFR(
-                n,
-                avg_deg,
-                max_deg,
-                exponent,
-                min_community_size,
-                max_community_size,
-                community_exponent,
-                mu,
-            )
-            return lfr_nk, lfr_model
-        except Exception:
-            print(f"LFR graph not realizeable.. attempt: {i+1}")
+    simulate_fn = functools.partial(
+        SimulateLFR,
+        n,
+        avg_deg,
+        max_deg,
+        exponent,
+        min_community_size,
+        max_community_size,
+        community_exponent,
+        mu,
+    )
+    seeds = _AttemptSeeds(rng, num_tries)
+    if num_parallel_tries <= 1:
+        for i, seed in enumerate(seeds):
+            record, lfr_nk, lfr_model = _TimedSimulateLFR(i + 1, simulate_fn, seed)
+            if attempt_log is not None:
+                attempt_log.append(record)
+            if lfr_model is not None:
+                return lfr_nk, lfr_model
+        return None, None
+
+    # Seeded runs take attempts in order to return the lowest-numbered
+    # success; unseeded runs take whichever attempt succeeds first. Closing
+    # the generator terminates the attempts still running.
+    attempts = _SimulateLFRInProcesses(
+        simulate_fn, seeds, num_parallel_tries, ordered=rng is not None
+    )
+    try:
+        for record, lfr_nk, memberships in attempts:
+            if attempt_log is not None:
+                attempt_log.append(record)
+            if lfr_nk is not None:
+                partition = nk.structures.Partition(len(memberships), memberships)
+                return lfr_nk, _FinishedLFR(partition)
+    finally:
+        attempts.close()
     return None, None
 
 
@@ -164,6 +348,10 @@ def GenerateLFRGraphWithFeatures(
     edge_cluster_variance=1.0,
     normalize_features=True,
     num_tries=20,
+    edge_features_as_array=False,
+    rng=None,
+    edges_only=False,
+    num_parallel_tries=1,
 ):
     """
     Generates LFR graph for GraphWorld with node and edge features.
@@ -189,6 +377,14 @@ def GenerateLFRGraphWithFeatures(
         edge_cluster_variance: variance of edge clusters around their centers.
           Increasing this weakens the edge feature signal.
         num_tries: number of attempts at simulating LFR graph until success
+        edge_features_as_array: store edge features as one array aligned with
+          graph.get_edges() instead of a dict keyed by edge tuple.
+        rng: optional np.random.Generator driving the graph and all features.
+          If None, the global RNG states are used.
+        edges_only: skip graph_tool and only store the edge array in
+          result.edge_index, leaving result.graph as None.
+        num_parallel_tries: number of concurrent attempts, see
+          SimulateLFRWrapper.
     Returns:
         result: LFR dataclass instance to store graph data
     """
@@ -203,10 +399,16 @@ def GenerateLFRGraphWithFeatures(
         community_exponent,
         mixing_param,
         num_tries,
+        rng=rng,
+        num_parallel_tries=num_parallel_tries,
     )
     if lfr_model is None:
         return None
-    result.graph = NetworkitToGraphWorldData(lfr_nk)
+    if edges_only:
+        result.graph = None
+        result.edge_index = NetworkitToEdgeIndex(lfr_nk)
+    else:
+        result.graph = NetworkitToGraphWorldData(lfr_nk)
     result.graph_memberships = np.array(lfr_model.getPartition().getVector())
     SimulateFeatures(
         result,
@@ -216,8 +418,14 @@ def GenerateLFRGraphWithFeatures(
         feature_group_match_type,
         feature_cluster_variance,
         normalize_features,
+        rng=rng,
     )
     SimulateEdgeFeatures(
-        result, edge_feature_dim, edge_center_distance, edge_cluster_variance
+        result,
+        edge_feature_dim,
+        edge_center_distance,
+        edge_cluster_variance,
+        as_array=edge_features_as_array,
+        rng=rng,
     )
     return result
@@ -0,0 +1,79 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Random number generator plumbing shared by the graph generators.
+
+Every generator function takes an optional np.random.Generator `rng`. Streams
+are keyed on (seed, sample_id, subgraph_index) through SeedSequence spawn keys,
+so any sample or subgraph can be regenerated on its own, in any process.
+"""
+
+import random
+
+import graph_tool
+import numpy as np
+
+# Upper bound for integer seeds handed to libraries with 32-bit seed APIs.
+_MAX_SEED = 2**31 - 1
+
+
+def MakeSeedSequence(seed=None, sample_id=None, subgraph_index=None):
+    """Returns the SeedSequence for a sample, or for one subgraph of a sample.
+    The stream of subgraph i of a sample equals
+    MakeSeedSequence(seed, sample_id).spawn(n)[i], so callers may either spawn
+    children or build them directly.
+    Args:
+      seed: root entropy (int or sequence of ints). If None, fresh OS entropy
+        is used and the result is not reproducible.
+      sample_id: (int) index of the sample in the pipeline.
+      subgraph_index: (int) index of the subgraph within the sample.
+    Returns:
+      an np.random.SeedSequence.
+    """
+    spawn_key = tuple(
+        int(key) for key in (sample_id, subgraph_index) if key is not None
+    )
+    return np.random.SeedSequence(seed, spawn_key=spawn_key)
+
+
+def MakeRng(seed=None, sample_id=None, subgraph_index=None):
+    """Returns an np.random.Generator for MakeSeedSequence(...) of the args."""
+    return np.random.default_rng(MakeSeedSequence(seed, sample_id, subgraph_index))
+
+
+def GetRng(rng=None):
+    """Returns `rng`, or the global np.random module if it is None.
+    The module shares the Generator methods the generators draw from (normal,
+    uniform, poisson, ...), so callers without an rng keep the legacy global
+    state behavior.
+    """
+    return np.random if rng is None else rng
+
+
+def DrawSeed(rng):
+    """Draws an integer seed from `rng` for libraries with their own RNG."""
+    return int(rng.integers(_MAX_SEED))
+
+
+def SeedGraphTool(rng):
+    """Seeds graph_tool's internal RNG from `rng`."""
+    graph_tool.seed_rng(DrawSeed(rng))
+
+
+def SeedGlobalRngs(rng):
+    """Seeds Python's `random` and the global np.random state from `rng`.
+    Only needed for third-party generators (e.g. CABAM) that draw from the
+    global RNGs and take no generator argument.
+    """
+    random.seed(DrawSeed(rng))
+    np.random.seed(DrawSeed(rng))
@@ -13,11 +13,14 @@
 # limitations under the License.
 
 import collections
+import concurrent.futures
 import dataclasses
 import enum
+import functools
 import math
+import os
 import random
-from typing import Dict, List, Sequence, Tuple
+from typing import Dict, List, Sequence, Tuple, Union
 
 import graph_tool
 import numpy as np
@@ -26,6 +29,8 @@ from tqdm import tqdm
 
 from graph_tool.all import *
 
+from graph_world.generators import random_utils
+
 
 class MatchType(enum.Enum):
     """Indicates type of feature/graph membership matching to do.
@@ -52,14 +57,45 @@ class StochasticBlockModel:
       node_features: numpy array of node features.
       feature_memberships: list of integer node feature classes.
       edge_features: map from edge tuple to numpy array. Only stores undirected
-        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be.
+        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be. May
+        instead be a (num_edges, dim) array aligned with graph.get_edges().
+      edge_index: (num_edges, 2) int32 array of undirected edges (u < v). Only
+        set by the "numpy" SimulateSbm backend, which leaves graph as None.
     """
 
     graph: graph_tool.Graph = Ellipsis
     graph_memberships: np.ndarray = Ellipsis
     node_features: np.ndarray = Ellipsis
     feature_memberships: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
+    edge_index: np.ndarray = None
+
+
+@dataclasses.dataclass
+class StochasticBlockModelBatch:
+    """Stores a batch of SBM subgraphs as concatenated arrays.
+    Node ids are global to the batch: subgraph i owns nodes
+    node_offsets[i]:node_offsets[i + 1] and edges
+    edge_offsets[i]:edge_offsets[i + 1].
+    Attributes:
+      num_graphs: number of subgraphs in the batch.
+      node_offsets: (num_graphs + 1,) int64 array of node offsets.
+      edge_offsets: (num_graphs + 1,) int64 array of edge offsets.
+      edge_index: (num_edges, 2) int array of undirected edges (u < v) sorted by
+        (u, v), i.e. the upper triangle of the block-diagonal adjacency matrix.
+      indptr: (num_nodes + 1,) int64 CSR row pointer into edge_index, so the
+        neighbors v > u of node u are edge_index[indptr[u]:indptr[u + 1], 1].
+      graph_memberships: stacked np vector of integer node classes.
+      node_features: stacked (num_nodes, feature_dim) float32 feature matrix.
+    """
+
+    num_graphs: int = Ellipsis
+    node_offsets: np.ndarray = Ellipsis
+    edge_offsets: np.ndarray = Ellipsis
+    edge_index: np.ndarray = Ellipsis
+    indptr: np.ndarray = Ellipsis
+    graph_memberships: np.ndarray = Ellipsis
+    node_features: np.ndarray = Ellipsis
 
 
 def _GetNestingMap(large_k, small_k):
@@ -92,7 +128,7 @@ def _GetNestingMap(large_k, small_k):
 
 
 def _GenerateFeatureMemberships(
-    graph_memberships, num_groups=None, match_type=MatchType.RANDOM
+    graph_memberships, num_groups=None, match_type=MatchType.RANDOM, rng=None
 ):
     """Generates a feature membership assignment.
     Args:
@@ -100,32 +136,32 @@ def _GenerateFeatureMemberships(
       num_groups: (int) number of groups. If None, defaults to number of unique
         values in graph_memberships.
       match_type: (MatchType) see the enum class description.
+      rng: optional np.random.Generator for MatchType.RANDOM. If None, the
+        global `random` module is used.
     Returns:
       memberships: a int list - index i contains feature group of node i.
     """
     # Parameter checks
     if num_groups is not None and num_groups == 0:
         raise ValueError("argument num_groups must be None or positive")
-    graph_num_groups = len(set(graph_memberships))
+    graph_memberships = np.asarray(graph_memberships)
+    graph_num_groups = np.unique(graph_memberships).shape[0]
     if num_groups is None:
         num_groups = graph_num_groups
 
     # Compute memberships
-    memberships = []
     if match_type == MatchType.GROUPED:
         if num_groups > graph_num_groups:
             raise ValueError(
                 "for match type GROUPED, must have num_groups <= graph_num_groups"
             )
         nesting_map = _GetNestingMap(graph_num_groups, num_groups)
-        # Creates deterministic map from (smaller) graph clusters to (larger)
-        # feature clusters.
-        reverse_nesting_map = {}
+        # Creates deterministic lookup table from (smaller) graph clusters to
+        # (larger) feature clusters.
+        reverse_nesting_map = np.empty(graph_num_groups, dtype=int)
         for feature_cluster, graph_cluster_list in nesting_map.items():
-            for cluster in graph_cluster_list:
-                reverse_nesting_map[cluster] = feature_cluster
-        for cluster in graph_memberships:
-            memberships.append(reverse_nesting_map[cluster])
+            reverse_nesting_map[graph_cluster_list] = feature_cluster
+        memberships = reverse_nesting_map[graph_memberships]
     elif match_type == MatchType.NESTED:
         if num_groups < graph_num_groups:
             raise ValueError(
@@ -133,21 +169,26 @@ def _GenerateFeatureMemberships(
             )
         nesting_map = _GetNestingMap(num_groups, graph_num_groups)
         # Creates deterministic map from (smaller) feature clusters to (larger)
-        # graph clusters.
-        for graph_cluster_id, feature_cluster_ids in nesting_map.items():
-            sorted_feature_cluster_ids = sorted(feature_cluster_ids)
-            num_feature_groups = len(sorted_feature_cluster_ids)
+        # graph clusters. Only the per-cluster sizes are computed in Python; the
+        # memberships themselves are laid out with one np.repeat.
+        graph_cluster_sizes = np.bincount(graph_memberships, minlength=graph_num_groups)
+        feature_cluster_ids = []
+        feature_cluster_sizes = []
+        for graph_cluster_id, cluster_ids in nesting_map.items():
+            num_feature_groups = len(cluster_ids)
             feature_pi = np.ones(num_feature_groups) / num_feature_groups
-            num_graph_cluster_nodes = np.sum(
-                [i == graph_cluster_id for i in graph_memberships]
+            feature_cluster_ids.extend(sorted(cluster_ids))
+            feature_cluster_sizes.extend(
+                _ComputeCommunitySizes(
+                    graph_cluster_sizes[graph_cluster_id], feature_pi
+                )
             )
-            sub_memberships = _GenerateNodeMemberships(
-                num_graph_cluster_nodes, feature_pi
-            )
-            sub_memberships = [sorted_feature_cluster_ids[i] for i in sub_memberships]
-            memberships.extend(sub_memberships)
+        memberships = np.repeat(feature_cluster_ids, feature_cluster_sizes)
     else:  # MatchType.RANDOM
-        memberships = random.choices(range(num_groups), k=len(graph_memberships))
+        if rng is None:
+            memberships = random.choices(range(num_groups), k=len(graph_memberships))
+        else:
+            memberships = rng.integers(num_groups, size=len(graph_memberships))
     return np.array(memberships)
 
 
@@ -202,15 +243,105 @@ def _GenerateNodeMemberships(num_vertices, pi):
       np vector of ints representing community indices.
     """
     community_sizes = _ComputeCommunitySizes(num_vertices, pi)
-    memberships = np.zeros(num_vertices, dtype=int)
-    node = 0
-    for i in range(len(pi)):
-        memberships[range(node, node + community_sizes[i])] = i
-        node += community_sizes[i]
-    return memberships
+    return np.repeat(np.arange(len(pi)), community_sizes)
+
 
+def _SampleSbmEdges(memberships, edge_counts, out_degs=None, num_graphs=1, rng=None):
+    """Samples SBM edges directly into an edge array with vectorized NumPy.
+    Mirrors graph_tool.generate_sbm with its default (canonical, Poisson)
+    settings: the number of edges between blocks r < s is Poisson with mean
+    edge_counts[r, s] (edge_counts[r, r] / 2 within block r), and endpoints
+    are drawn inside their block proportionally to out_degs. Self-loops and
+    parallel edges are dropped in the same pass.
+    Args:
+      memberships: np vector of block indices, one per node.
+      edge_counts: symmetric k x k matrix of expected edge counts, as returned
+        by _ComputeExpectedEdgeCounts.
+      out_degs: Out-degree propensity for each node, normalized inside each
+        block. If not provided, endpoints are uniform within their block.
+      num_graphs: number of independent graphs to sample in one pass. Nodes of
+        graph g are numbered from g * len(memberships).
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
+    Returns:
+      edge_index: (num_edges, 2) array of unique edges with u < v, sorted, so
+        the edges of each graph are contiguous. int32 unless the total node
+        count needs int64.
+    """
+    rng = random_utils.GetRng(rng)
+    memberships = np.asarray(memberships)
+    num_vertices = memberships.shape[0]
+    num_nodes = num_graphs * num_vertices
+    k = edge_counts.shape[0]
+    block_sizes = np.bincount(memberships, minlength=k)
+
+    # Edge counts per unordered block pair.
+    rows, cols = np.triu_indices(k)
+    rates = edge_counts[rows, cols].astype(np.float64)
+    rates[rows == cols] /= 2.0
+    rates[(block_sizes[rows] == 0) | (block_sizes[cols] == 0)] = 0.0
+    pair_counts = rng.poisson(rates, size=(num_graphs, rates.shape[0]))
+    pair_counts = pair_counts.ravel()
+    source_blocks = np.repeat(np.tile(rows, num_graphs), pair_counts)
+    target_blocks = np.repeat(np.tile(cols, num_graphs), pair_counts)
+    node_offsets = np.repeat(
+        np.repeat(np.arange(num_graphs, dtype=np.int64) * num_vertices, len(rows)),
+        pair_counts,
+    )
+
+    # Nodes sorted by block, with a CDF that runs from r to r + 1 over block r,
+    # so one searchsorted call samples an endpoint for every edge at once.
+    order = np.argsort(memberships, kind="stable")
+    sorted_blocks = memberships[order]
+    if out_degs is None:
+        weights = np.ones(num_vertices)
+    else:
+        weights = np.asarray(out_degs, dtype=np.float64)[order]
+    block_weights = np.bincount(sorted_blocks, weights=weights, minlength=k)
+    weights = np.where(block_weights[sorted_blocks] > 0, weights, 1.0)
+    block_weights = np.bincount(sorted_blocks, weights=weights, minlength=k)
+    block_starts = np.concatenate([[0], np.cumsum(block_sizes)[:-1]])
+    cumulative = np.cumsum(weights)
+    offsets = np.concatenate([[0.0], cumulative])[block_starts]
+    cdf = sorted_blocks + (cumulative - offsets[sorted_blocks]) / (
+        block_weights[sorted_blocks]
+    )
 
-def SimulateSbm(sbm_data, num_vertices, num_edges, pi, prop_mat, out_degs=None):
+    def _SampleEndpoints(blocks):
+        positions = np.searchsorted(
+            cdf, blocks + rng.uniform(size=blocks.shape[0]), side="right"
+        )
+        # Guard against round-off at block boundaries.
+        positions = np.clip(
+            positions,
+            block_starts[blocks],
+            block_starts[blocks] + block_sizes[blocks] - 1,
+        )
+        return order[positions]
+
+    sources = _SampleEndpoints(source_blocks) + node_offsets
+    targets = _SampleEndpoints(target_blocks) + node_offsets
+    u = np.minimum(sources, targets)
+    v = np.maximum(sources, targets)
+    keep = u != v
+    keys = np.unique(u[keep] * num_nodes + v[keep])
+    dtype = np.int32 if num_nodes <= np.iinfo(np.int32).max else np.int64
+    edge_index = np.empty((keys.shape[0], 2), dtype=dtype)
+    edge_index[:, 0] = keys // num_nodes
+    edge_index[:, 1] = keys % num_nodes
+    return edge_index
+
+
+def SimulateSbm(
+    sbm_data,
+    num_vertices,
+    num_edges,
+    pi,
+    prop_mat,
+    out_degs=None,
+    backend="graph_tool",
+    rng=None,
+):
     """Generates a stochastic block model, storing data in sbm_data.graph.
     This function uses graph_tool.generate_sbm. Refer to that
     documentation for more information on the model and parameters.
@@ -223,14 +354,31 @@ def SimulateSbm(sbm_data, num_vertices, num_edges, pi, prop_mat, out_degs=None):
       out_degs: Out-degree propensity for each node. If not provided, a constant
         value will be used. Note that the values will be normalized inside each
         group, if they are not already so.
+      backend: (str) "graph_tool" (default) builds sbm_data.graph with
+        graph_tool.generate_sbm. "numpy" samples the same model with
+        _SampleSbmEdges into sbm_data.edge_index and sets sbm_data.graph to
+        None; use EdgeIndexToGraph if a graph_tool graph is needed later.
+      rng: optional np.random.Generator. The "numpy" backend draws from it
+        directly; the "graph_tool" backend seeds graph_tool's RNG from it. If
+        None, the global RNG states are used.
     Returns: (none)
     """
     if round(abs(np.sum(pi) - 1.0), 12) != 0:
         raise ValueError("entries of pi ( must sum to 1.0")
     if prop_mat.shape[0] != len(pi) or prop_mat.shape[1] != len(pi):
         raise ValueError("prop_mat must be k x k where k = len(pi)")
+    if backend not in ("graph_tool", "numpy"):
+        raise ValueError("backend must be 'graph_tool' or 'numpy'")
     sbm_data.graph_memberships = _GenerateNodeMemberships(num_vertices, pi)
     edge_counts = _ComputeExpectedEdgeCounts(num_edges, num_vertices, pi, prop_mat)
+    if backend == "numpy":
+        sbm_data.graph = None
+        sbm_data.edge_index = _SampleSbmEdges(
+            sbm_data.graph_memberships, edge_counts, out_degs, rng=rng
+        )
+        return
+    if rng is not None:
+        random_utils.SeedGraphTool(rng)
     sbm_data.graph = graph_tool.generation.generate_sbm(
         sbm_data.graph_memberships, edge_counts, out_degs
     )
@@ -239,6 +387,58 @@ def SimulateSbm(sbm_data, num_vertices, num_edges, pi, prop_mat, out_degs=None):
     sbm_data.graph.reindex_edges()
 
 
+def GetEdgeIndex(sbm_data):
+    """Returns the (num_edges, 2) edge array of sbm_data, for either backend."""
+    if sbm_data.graph is None:
+        return sbm_data.edge_index
+    return sbm_data.graph.get_edges()
+
+
+def EdgeIndexToGraph(num_vertices, edge_index):
+    """Builds an undirected graph_tool Graph from a (num_edges, 2) edge array."""
+    graph = graph_tool.Graph(directed=False)
+    graph.add_vertex(num_vertices)
+    graph.add_edge_list(edge_index)
+    return graph
+
+
+def SampleMixtureFeatures(
+    memberships, num_groups, feature_dim, center_var, cluster_var, out=None, rng=None
+):
+    """Draws node features from an isotropic Gaussian mixture in one pass.
+    Equivalent to drawing each center from N(0, center_var * I) and each node
+    feature from N(centers[membership], cluster_var * I), but uses one
+    vectorized standard normal draw per stage instead of one
+    np.random.multivariate_normal call per center and per node.
+    Args:
+      memberships: int array of feature cluster indices, one per node.
+      num_groups: (int) number of cluster centers.
+      feature_dim: (int) dimension of the features.
+      center_var: (float) variance of the cluster centers around the origin.
+      cluster_var: (float) variance of the node features around their centers.
+      out: optional preallocated float array of shape
+        (len(memberships), feature_dim), e.g. a float32 buffer. If None, a
+        float64 array is allocated.
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
+    Returns:
+      features: the feature matrix (`out` if it was given).
+    """
+    rng = random_utils.GetRng(rng)
+    memberships = np.asarray(memberships)
+    shape = (memberships.shape[0], feature_dim)
+    if out is None:
+        out = np.empty(shape)
+    elif out.shape != shape:
+        raise ValueError("out must have shape %s, got %s" % (shape, out.shape))
+    centers = rng.standard_normal((num_groups, feature_dim))
+    centers *= math.sqrt(center_var)
+    out[...] = rng.standard_normal(shape)
+    out *= math.sqrt(cluster_var)
+    out += centers[memberships]
+    return out
+
+
 def SimulateFeatures(
     sbm_data,
     center_var,
@@ -248,6 +448,8 @@ def SimulateFeatures(
     cluster_var=1.0,
     normalize_features=True,
     random_generate=False,
+    out=None,
+    rng=None,
 ):
     """Generates node features using multivate normal mixture model.
     This function does nothing and throws a warning if
@@ -262,6 +464,13 @@ def SimulateFeatures(
        mean zero and covariance matrix cluster_var * I_{feature_dim}.
       match_type: (MatchType) see sbm_simulator.MatchType for details.
       cluster_var: (float) variance of feature clusters around their centers.
+      normalize_features: (bool) whether to L2-normalize each feature row.
+      random_generate: (bool) if True, ignore memberships and draw standard
+        normal features.
+      out: optional preallocated (num_vertices, feature_dim) float array (e.g.
+        float32) that the features are written into in place.
+      rng: optional np.random.Generator. If None, the global RNG states are
+        used.
     Raises:
       RuntimeWarning: if simulator has no graph or a graph with no nodes.
     """
@@ -271,42 +480,47 @@ def SimulateFeatures(
             "Run SimulateSbm to generate graph_memberships."
         )
     if random_generate:
-        features = np.random.randn(sbm_data.graph.num_vertices(), feature_dim)
+        shape = (len(sbm_data.graph_memberships), feature_dim)
+        if out is None:
+            features = random_utils.GetRng(rng).standard_normal(shape)
+        else:
+            features = out
+            features[...] = random_utils.GetRng(rng).standard_normal(shape)
     else:
         # Get memberships
         sbm_data.feature_memberships = _GenerateFeatureMemberships(
             graph_memberships=sbm_data.graph_memberships,
             num_groups=num_groups,
             match_type=match_type,
+            rng=rng,
+        )
+        features = SampleMixtureFeatures(
+            sbm_data.feature_memberships,
+            num_groups,
+            feature_dim,
+            center_var,
+            cluster_var,
+            out=out,
+            rng=rng,
         )
-
-        # Get centers
-        centers = []
-        center_cov = np.identity(feature_dim) * center_var
-        cluster_cov = np.identity(feature_dim) * cluster_var
-        for _ in range(num_groups):
-            center = np.random.multivariate_normal(
-                np.zeros(feature_dim), center_cov, 1
-            )[0]
-            centers.append(center)
-        features = []
-        for cluster_index in sbm_data.feature_memberships:
-            feature = np.random.multivariate_normal(
-                centers[cluster_index], cluster_cov, 1
-            )[0]
-            features.append(feature)
-        features = np.array(features)
         if normalize_features:
-            features = normalize(features)
+            features = normalize(features, copy=False)
     sbm_data.node_features = features
 
 
 def SimulateEdgeFeatures(
-    sbm_data, feature_dim, center_distance=0.0, cluster_variance=1.0
+    sbm_data,
+    feature_dim,
+    center_distance=0.0,
+    cluster_variance=1.0,
+    as_array=False,
+    rng=None,
 ):
     """Generates edge feature distribution via inter-class vs intra-class.
     Edge feature data is stored as an sbm_data attribute named `edge_feature`, a
-    dict from 2-tuples of node IDs to numpy vectors.
+    dict from 2-tuples of node IDs to numpy vectors. If `as_array` is True, it is
+    instead a single (num_edges, feature_dim) matrix whose row i belongs to edge
+    i of GetEdgeIndex(sbm_data).
     Edge features have two centers: one at (0, 0, ....) and one at
     (center_distance, center_distance, ....) for inter-class and intra-class
     edges (respectively). They are generated from a multivariate normal with
@@ -319,33 +533,128 @@ def SimulateEdgeFeatures(
       center_distance: (float) per-dimension distance between the intra-class and
         inter-class means. Increasing this makes the edge feature signal stronger.
       cluster_variance: (float) variance of clusters around their centers.
+      as_array: (bool) store the features as one array aligned with
+        GetEdgeIndex(sbm_data), generated in a single vectorized draw.
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
     Raises:
       RuntimeWarning: if simulator has no graph or a graph with no nodes.
     """
-    if sbm_data.graph is None:
+    if sbm_data.graph is None and sbm_data.edge_index is None:
         raise RuntimeWarning("SbmSimulator has no graph: no features generated.")
-    if sbm_data.graph.num_vertices() == 0:
-        raise RuntimeWarning("graph has no nodes: no features generated.")
     if sbm_data.graph_memberships is None:
         raise RuntimeWarning("graph has no memberships: no features generated.")
+    if len(sbm_data.graph_memberships) == 0:
+        raise RuntimeWarning("graph has no nodes: no features generated.")
+
+    rng = random_utils.GetRng(rng)
+    edges = GetEdgeIndex(sbm_data)
+    if as_array:
+        memberships = np.asarray(sbm_data.graph_memberships)
+        intra_class = memberships[edges[:, 0]] == memberships[edges[:, 1]]
+        edge_features = rng.standard_normal((edges.shape[0], feature_dim))
+        edge_features *= math.sqrt(cluster_variance)
+        edge_features[intra_class] += center_distance
+        sbm_data.edge_features = edge_features
+        return
 
     center0 = np.zeros(shape=(feature_dim,))
     center1 = np.ones(shape=(feature_dim,)) * center_distance
     covariance = np.identity(feature_dim) * cluster_variance
     sbm_data.edge_features = {}
-    for edge in sbm_data.graph.edges():
-        vertex1 = int(edge.source())
-        vertex2 = int(edge.target())
+    for vertex1, vertex2 in edges.tolist():
         edge_tuple = tuple(sorted((vertex1, vertex2)))
         if sbm_data.graph_memberships[vertex1] == sbm_data.graph_memberships[vertex2]:
             center = center1
         else:
             center = center0
-        sbm_data.edge_features[edge_tuple] = np.random.multivariate_normal(
+        sbm_data.edge_features[edge_tuple] = rng.multivariate_normal(
             center, covariance, 1
         )[0]
 
 
+def BidirectionalEdgeFeatures(graph, edge_features):
+    """Lists both directions of every graph edge with its edge features.
+    Args:
+      graph: undirected graph_tool Graph.
+      edge_features: edge features as SimulateEdgeFeatures stores them, either
+        a dict from sorted 2-tuples of node IDs to vectors or a
+        (num_edges, feature_dim) array aligned with graph.get_edges().
+    Returns:
+      edge_tuples: (2 * num_edges, 2) source and target node IDs, each edge
+        followed by its reverse.
+      edge_feature_data: the features of the edge_tuples rows.
+    """
+    if isinstance(edge_features, np.ndarray):
+        # Array-backed edge features are aligned with graph.get_edges(), so both
+        # directions of every edge can be emitted without per-edge lookups.
+        edges = graph.get_edges().astype(np.int64)
+        edge_tuples = np.stack([edges, edges[:, ::-1]], axis=1).reshape(-1, 2)
+        return edge_tuples, np.repeat(edge_features, 2, axis=0)
+    edge_tuples = []
+    edge_feature_data = []
+    for edge in graph.iter_edges():
+        edge_tuples.append([edge[0], edge[1]])
+        edge_tuples.append([edge[1], edge[0]])
+        ordered_tuple = (edge[0], edge[1])
+        if edge[0] > edge[1]:
+            ordered_tuple = (edge[1], edge[0])
+        edge_feature_data.append(edge_features[ordered_tuple])
+        edge_feature_data.append(edge_features[ordered_tuple])
+    return edge_tuples, edge_feature_data
+
+
+def _InitSubgraphWorker():
+    # Each worker process generates whole subgraphs, so graph_tool's OpenMP
+    # threads would only oversubscribe the cores shared by the pool.
+    graph_tool.openmp_set_num_threads(1)
+
+
+def _GenerateStochasticBlockModelSubgraph(
+    seed_sequence,
+    num_vertices,
+    num_edges,
+    pi,
+    prop_mat,
+    out_degs,
+    feature_center_distance,
+    feature_dim,
+    num_feature_groups,
+    feature_group_match_type,
+    feature_cluster_variance,
+    normalize_features,
+    sbm_backend,
+):
+    """Generates one subgraph of GenerateStochasticBlockModelWithFeatures."""
+    rng = None if seed_sequence is None else np.random.default_rng(seed_sequence)
+    result = StochasticBlockModel()
+    SimulateSbm(
+        result,
+        num_vertices,
+        num_edges,
+        pi,
+        prop_mat,
+        out_degs,
+        backend=sbm_backend,
+        rng=rng,
+    )
+    SimulateFeatures(
+        result,
+        feature_center_distance,
+        feature_dim,
+        num_feature_groups,
+        feature_group_match_type,
+        feature_cluster_variance,
+        normalize_features,
+        random_generate=True,
+        rng=rng,
+    )
+    # SimulateEdgeFeatures(result, edge_feature_dim,
+    #                     edge_center_distance,
+    #                     edge_cluster_variance)
+    return result
+
+
 def GenerateStochasticBlockModelWithFeatures(
     num_graphs,
     num_vertices,
@@ -362,6 +671,9 @@ def GenerateStochasticBlockModelWithFeatures(
     edge_center_distance=0.0,
     edge_cluster_variance=1.0,
     normalize_features=True,
+    num_workers=1,
+    seed=None,
+    sbm_backend="graph_tool",
 ):
     """Generates stochastic block model (SBM) with node features.
     Args:
@@ -388,28 +700,113 @@ def GenerateStochasticBlockModelWithFeatures(
         inter-class means. Increasing this strengthens the edge feature signal.
       edge_cluster_variance: variance of edge clusters around their centers.
         Increasing this weakens the edge feature signal.
+      num_workers: number of processes used to generate the subgraphs. 1 runs
+        serially in this process; None uses every core.
+      seed: optional int, sequence of ints or np.random.SeedSequence (see
+        random_utils.MakeSeedSequence). Subgraph i draws from the i-th spawned
+        child, so the output does not depend on num_workers and any subgraph
+        can be regenerated on its own.
+      sbm_backend: SimulateSbm backend, "graph_tool" or "numpy".
     Returns:
-      result: a StochasticBlockModel data class.
+      result: a list of num_graphs StochasticBlockModel data classes, in order.
     """
-    results = []
-    for i in tqdm(range(num_graphs), desc="generate subgraph by SBM simulator"):
-        result = StochasticBlockModel()
-        SimulateSbm(result, num_vertices, num_edges, pi, prop_mat, out_degs)
-        SimulateFeatures(
-            result,
-            feature_center_distance,
-            feature_dim,
-            num_feature_groups,
-            feature_group_match_type,
-            feature_cluster_variance,
-            normalize_features,
-            random_generate=True,
+    generate_fn = functools.partial(
+        _GenerateStochasticBlockModelSubgraph,
+        num_vertices=num_vertices,
+        num_edges=num_edges,
+        pi=pi,
+        prop_mat=prop_mat,
+        out_degs=out_degs,
+        feature_center_distance=feature_center_distance,
+        feature_dim=feature_dim,
+        num_feature_groups=num_feature_groups,
+        feature_group_match_type=feature_group_match_type,
+        feature_cluster_variance=feature_cluster_variance,
+        normalize_features=normalize_features,
+        sbm_backend=sbm_backend,
+    )
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    # Worker processes fork the parent's global RNG state, so parallel runs
+    # always get one spawned seed per subgraph, even when no seed is given.
+    if seed is not None or num_workers > 1:
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        seed_sequences = seed.spawn(num_graphs)
+    else:
+        seed_sequences = [None] * num_graphs
+
+    desc = "generate subgraph by SBM simulator"
+    if num_workers <= 1:
+        return [generate_fn(ss) for ss in tqdm(seed_sequences, desc=desc)]
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers, initializer=_InitSubgraphWorker
+    ) as executor:
+        chunksize = max(1, num_graphs // (4 * num_workers))
+        # executor.map yields results in submission order.
+        return list(
+            tqdm(
+                executor.map(generate_fn, seed_sequences, chunksize=chunksize),
+                total=num_graphs,
+                desc=desc,
+            )
         )
-        # SimulateEdgeFeatures(result, edge_feature_dim,
-        #                     edge_center_distance,
-        #                     edge_cluster_variance)
-        results.append(result)
-    return results
+
+
+def GenerateStochasticBlockModelBatch(
+    num_graphs,
+    num_vertices,
+    num_edges,
+    pi,
+    prop_mat,
+    out_degs=None,
+    feature_dim=0,
+    rng=None,
+):
+    """Generates a batch of SBM subgraphs in one vectorized step.
+    Samples the same model as GenerateStochasticBlockModelWithFeatures with the
+    "numpy" SimulateSbm backend and standard normal node features, but for all
+    subgraphs at once, without building a StochasticBlockModel or graph_tool
+    Graph per subgraph.
+    Args:
+      num_graphs: number of sub-graph
+      num_vertices: number of nodes in each subgraph.
+      num_edges: expected number of edges in each subgraph.
+      pi: interable of non-zero community size proportions. Must sum to 1.0.
+      prop_mat: square, symmetric matrix of community edge count rates.
+      out_degs: Out-degree propensity for each node of a subgraph. If not
+        provided, a constant value will be used.
+      feature_dim: dimension of node features.
+      rng: optional np.random.Generator. If None, the global np.random state is
+        used.
+    Returns:
+      result: a StochasticBlockModelBatch data class.
+    """
+    if round(abs(np.sum(pi) - 1.0), 12) != 0:
+        raise ValueError("entries of pi ( must sum to 1.0")
+    if prop_mat.shape[0] != len(pi) or prop_mat.shape[1] != len(pi):
+        raise ValueError("prop_mat must be k x k where k = len(pi)")
+    memberships = _GenerateNodeMemberships(num_vertices, pi)
+    edge_counts = _ComputeExpectedEdgeCounts(num_edges, num_vertices, pi, prop_mat)
+    rng = random_utils.GetRng(rng)
+    edge_index = _SampleSbmEdges(
+        memberships, edge_counts, out_degs, num_graphs, rng=rng
+    )
+
+    num_nodes = num_graphs * num_vertices
+    node_offsets = np.arange(num_graphs + 1, dtype=np.int64) * num_vertices
+    indptr = np.searchsorted(edge_index[:, 0], np.arange(num_nodes + 1))
+    node_features = np.empty((num_nodes, feature_dim), dtype=np.float32)
+    node_features[...] = rng.standard_normal(node_features.shape)
+    return StochasticBlockModelBatch(
+        num_graphs=num_graphs,
+        node_offsets=node_offsets,
+        edge_offsets=indptr[node_offsets],
+        edge_index=edge_index,
+        indptr=indptr,
+        graph_memberships=np.tile(memberships, num_graphs),
+        node_features=node_features,
+    )
 
 
 # Helper function to create the "Pi" vector for the SBM model (the
@@ -432,18 +829,16 @@ def MakePropMat(num_communities: int, p_to_q_ratio: float) -> np.ndarray:
 
 
 # Helper function to create a degree set that follows a power law for the
-# 'out_degs' parameter in SBM construction.
-def MakeDegrees(power_exponent, min_deg, num_vertices):
-    degrees = np.zeros(num_vertices)
-    k_min = min_deg
-    k_max = num_vertices
-    gamma = power_exponent
-    for i in range(num_vertices):
-        degrees[i] = int(power_law(k_min, k_max, np.random.uniform(0, 1), gamma))
-    return degrees
-
-
-# Helper function of MakeDegrees to construct power law samples
+# 'out_degs' parameter in SBM construction. The whole sequence is drawn in one
+# vectorized inverse-CDF pass; pass an np.random.Generator as `rng` to make it
+# reproducible, otherwise the global np.random state is used.
+def MakeDegrees(power_exponent, min_deg, num_vertices, rng=None):
+    y = random_utils.GetRng(rng).uniform(0, 1, size=num_vertices)
+    return np.floor(power_law(min_deg, num_vertices, y, power_exponent))
+
+
+# Helper function of MakeDegrees to construct power law samples. Accepts a
+# scalar or an array of uniform samples `y`.
 def power_law(k_min, k_max, y, gamma):
     return (
         (k_max ** (-gamma + 1) - k_min ** (-gamma + 1)) * y + k_min ** (-gamma + 1.0)
@@ -17,7 +17,6 @@ import logging, pdb
 import apache_beam as beam
 import gin
 import numpy as np
-import pandas as pd
 
 # from torch_geometric.data import DataLoader
 
@@ -25,7 +24,10 @@ from ..beam.benchmarker import BenchmarkGNNParDo
 from ..beam.generator_beam_handler import GeneratorBeamHandler
 
 # from .utils import graph_regression_dataset_example_to_torch_geo_data
+from ..metrics.aggregators import MetricsDistribution, MetricsMoments
 from ..metrics.graph_metrics import graph_metrics
+from ..metrics.graph_metrics_batched import graph_metrics_batched
+from ..metrics.metrics_cache import cached_metrics, metrics_cache_dir, MetricsCache
 
 
 class SampleGraphRegressionDatasetDoFn(beam.DoFn):
@@ -47,12 +49,61 @@ class WriteGraphRegressionDatasetDoFn(beam.DoFn):
 
 
 class ComputeGraphRegressionMetricsParDo(beam.DoFn):
+    def __init__(
+        self,
+        metrics_backend="networkx",
+        metrics_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
+        metrics_distribution=False,
+        metrics_quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
+    ):
+        self._metrics_backend = metrics_backend
+        self._metrics_options = metrics_options or {}
+        self._cache_metrics = cache_metrics
+        self._metrics_cache_dir = metrics_cache_dir
+        self._metrics_cache = None
+        self._metrics_distribution = metrics_distribution
+        self._metrics_quantiles = tuple(metrics_quantiles)
+
+    def SetOutputPath(self, output_path):
+        if self._cache_metrics:
+            self._metrics_cache = MetricsCache(
+                metrics_cache_dir(output_path, self._metrics_cache_dir)
+            )
+
+    def _ComputeMetrics(self, graphs):
+        if self._metrics_distribution:
+            aggregator = MetricsDistribution(self._metrics_quantiles)
+        else:
+            aggregator = MetricsMoments()
+        if self._metrics_backend == "sparse":
+            # All graphs at once on one block-diagonal adjacency matrix.
+            aggregator.AddRows(*graph_metrics_batched(graphs))
+        else:
+            for graph in graphs:
+                aggregator.AddRow(
+                    graph_metrics(graph, self._metrics_backend, **self._metrics_options)
+                )
+        if self._metrics_distribution:
+            return aggregator.Summary()
+        return aggregator.Means()
+
     def process(self, element):
         out = element
-        graph_metrics_df = pd.DataFrame(
-            data=[graph_metrics(graph) for graph in element["data"].graphs]
+        graphs = element["data"].graphs
+        out["metrics"] = cached_metrics(
+            self._metrics_cache,
+            [np.array([graph.num_vertices() for graph in graphs])]
+            + [graph.get_edges() for graph in graphs],
+            [
+                self._metrics_backend,
+                self._metrics_options,
+                self._metrics_distribution,
+                self._metrics_quantiles,
+            ],
+            lambda: self._ComputeMetrics(graphs),
         )
-        out["metrics"] = dict(graph_metrics_df.mean())
         yield out
 
 
@@ -127,12 +178,25 @@ class GraphRegressionBeamHandler(GeneratorBeamHandler):
         num_tuning_rounds=1,
         tuning_metric="",
         tuning_metric_is_loss=False,
+        metrics_backend="networkx",
+        metrics_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
+        metrics_distribution=False,
+        metrics_quantiles=(0.05, 0.25, 0.5, 0.75, 0.95),
     ):
         self._sample_do_fn = SampleGraphRegressionDatasetDoFn(generator_wrapper)
         # self._benchmark_par_do = BenchmarkGNNParDo(
         #     benchmarker_wrappers, num_tuning_rounds, tuning_metric,
         #     tuning_metric_is_loss)
-        self._metrics_par_do = ComputeGraphRegressionMetricsParDo()
+        self._metrics_par_do = ComputeGraphRegressionMetricsParDo(
+            metrics_backend,
+            metrics_options,
+            cache_metrics,
+            metrics_cache_dir,
+            metrics_distribution,
+            metrics_quantiles,
+        )
         self._batch_size = batch_size
 
     def GetSampleDoFn(self):
@@ -155,3 +219,4 @@ class GraphRegressionBeamHandler(GeneratorBeamHandler):
         self._write_do_fn = WriteGraphRegressionDatasetDoFn(output_path)
         self._convert_par_do = ConvertToTorchGeoDataParDo(output_path, self._batch_size)
         # self._benchmark_par_do.SetOutputPath(output_path)
+        self._metrics_par_do.SetOutputPath(output_path)
@@ -20,7 +20,9 @@ import numpy as np
 from sklearn.preprocessing import scale
 
 from ..beam.generator_config_sampler import GeneratorConfigSampler
-from ..generators.er_simulator import erdos_graph
+from ..generators.er_simulator import erdos_graph_edges
+from ..generators.random_utils import MakeRng
+from ..graphregression.substructure_counts import count_substructures
 from ..graphregression.utils import GraphRegressionDataset
 
 
@@ -73,13 +75,37 @@ def _GetSubstructureGraph(substruct: Substructure):
         return _get_tailed_triangle_graph()
 
 
+# Keys of substructure_counts.count_substructures for the substructures it
+# counts; any other substructure falls back to graph_tool.clustering.motifs.
+_FAST_SUBSTRUCTURE_COUNTS = {
+    Substructure.STAR_GRAPH: "star",
+    Substructure.TRIANGLE_GRAPH: "triangle",
+    Substructure.TAILED_TRIANGLE_GRAPH: "tailed_triangle",
+    Substructure.CHORDAL_CYCLE_GRAPH: "chordal_cycle",
+}
+
+
 def _GenerateSubstructureDataset(
     num_graphs: int,
     num_vertices: int,
     edge_prob: float,
     substruct_graph: graph_tool.Graph,
+    rng: np.random.Generator = None,
+    substruct: Substructure = None,
 ):
-    graphs = [erdos_graph(num_vertices, edge_prob) for _ in range(num_graphs)]
+    edge_index, edge_offsets = erdos_graph_edges(
+        num_graphs, num_vertices, edge_prob, rng
+    )
+    graphs = []
+    for i in range(num_graphs):
+        graph = graph_tool.Graph(directed=False)
+        graph.add_vertex(num_vertices)
+        graph.add_edge_list(edge_index[edge_offsets[i] : edge_offsets[i + 1]])
+        graphs.append(graph)
+    if substruct in _FAST_SUBSTRUCTURE_COUNTS:
+        counts = count_substructures(edge_index, edge_offsets, num_vertices)
+        substruct_counts = counts[_FAST_SUBSTRUCTURE_COUNTS[substruct]].tolist()
+        return {"graphs": graphs, "substruct_counts": substruct_counts}
     substruct_counts = []
     ## Generate graph regression graphs
     for graph in graphs:
@@ -96,10 +122,16 @@ def _GenerateSubstructureDataset(
 @gin.configurable
 class SubstructureGeneratorWrapper(GeneratorConfigSampler):
     def __init__(
-        self, param_sampler_specs, substruct, normalize_target=True, marginal=False
+        self,
+        param_sampler_specs,
+        substruct,
+        normalize_target=True,
+        marginal=False,
+        seed=None,
     ):
         super(SubstructureGeneratorWrapper, self).__init__(param_sampler_specs)
         self._marginal = marginal
+        self._seed = seed
         self._AddSamplerFn("num_graphs", self._SampleUniformInteger)
         self._AddSamplerFn("num_vertices", self._SampleUniformInteger)
         self._AddSamplerFn("edge_prob", self._SampleUniformFloat)
@@ -111,8 +143,9 @@ class SubstructureGeneratorWrapper(GeneratorConfigSampler):
     def Generate(self, sample_id):
         """Sample substructure dataset."""
 
+        rng = None if self._seed is None else MakeRng(self._seed, sample_id)
         generator_config, marginal_param, fixed_params = self.SampleConfig(
-            self._marginal
+            self._marginal, rng=rng
         )
         generator_config["generator_name"] = "Substructure"
 
@@ -121,6 +154,8 @@ class SubstructureGeneratorWrapper(GeneratorConfigSampler):
             num_vertices=generator_config["num_vertices"],
             edge_prob=generator_config["edge_prob"],
             substruct_graph=_GetSubstructureGraph(self._substruct),
+            rng=rng,
+            substruct=self._substruct,
         )
 
         if self._normalize_target:
@@ -23,8 +23,7 @@ from torch_geometric.data import DataLoader
 from ..beam.benchmarker import Benchmarker, BenchmarkGNNParDo
 from ..beam.generator_beam_handler import GeneratorBeamHandler
 from ..linkprediction.utils import linkprediction_data_to_torchgeo_data
-from ..metrics.graph_metrics import graph_metrics
-from ..metrics.node_label_metrics import NodeLabelMetrics
+from ..metrics.labeled_graph_metrics import LabeledGraphMetricsDoFn
 
 
 class SampleLinkPredictionDatasetDoFn(beam.DoFn):
@@ -91,17 +90,10 @@ class WriteLinkPredictionDatasetDoFn(beam.DoFn):
             f.close()
 
 
-class ComputeLinkPredictionMetrics(beam.DoFn):
+class ComputeLinkPredictionMetrics(LabeledGraphMetricsDoFn):
     def process(self, element):
         out = element
-        out["metrics"] = graph_metrics(element["data"].graph)
-        out["metrics"].update(
-            NodeLabelMetrics(
-                element["data"].graph,
-                element["data"].graph_memberships,
-                element["data"].node_features,
-            )
-        )
+        out["metrics"] = self.ComputeMetrics(element["data"])
         yield out
 
 
@@ -160,6 +152,12 @@ class LinkPredictionBeamHandler(GeneratorBeamHandler):
         tuning_metric="",
         tuning_metric_is_loss=False,
         save_tuning_results=False,
+        metrics_backend="networkx",
+        metrics_options=None,
+        feature_homogeneity_method="exact",
+        feature_homogeneity_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
     ):
         self._sample_do_fn = SampleLinkPredictionDatasetDoFn(generator_wrapper)
         self._benchmark_par_do = BenchmarkGNNParDo(
@@ -169,7 +167,14 @@ class LinkPredictionBeamHandler(GeneratorBeamHandler):
             tuning_metric_is_loss,
             save_tuning_results,
         )
-        self._metrics_par_do = ComputeLinkPredictionMetrics()
+        self._metrics_par_do = ComputeLinkPredictionMetrics(
+            metrics_backend,
+            metrics_options,
+            feature_homogeneity_method,
+            feature_homogeneity_options,
+            cache_metrics,
+            metrics_cache_dir,
+        )
         self._training_ratio = training_ratio
         self._tuning_ratio = tuning_ratio
 
@@ -195,3 +200,4 @@ class LinkPredictionBeamHandler(GeneratorBeamHandler):
             self._training_ratio, self._tuning_ratio
         )
         self._benchmark_par_do.SetOutputPath(output_path)
+        self._metrics_par_do.SetOutputPath(output_path)
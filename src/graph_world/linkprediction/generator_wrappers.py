@@ -17,6 +17,7 @@ import gin
 import numpy as np
 
 from ..beam.generator_config_sampler import GeneratorConfigSampler
+from ..generators.random_utils import GetRng, MakeRng, MakeSeedSequence
 from ..generators.sbm_simulator import (
     GenerateStochasticBlockModelWithFeatures,
     MakePi,
@@ -28,9 +29,12 @@ from ..linkprediction.utils import LinkPredictionDataset
 
 @gin.configurable
 class SbmGeneratorWrapper(GeneratorConfigSampler):
-    def __init__(self, param_sampler_specs, marginal=False, normalize_features=True):
+    def __init__(
+        self, param_sampler_specs, marginal=False, normalize_features=True, seed=None
+    ):
         super(SbmGeneratorWrapper, self).__init__(param_sampler_specs)
         self._marginal = marginal
+        self._seed = seed
         self._normalize_features = normalize_features
         self._AddSamplerFn("nvertex", self._SampleUniformInteger)
         self._AddSamplerFn("avg_degree", self._SampleUniformFloat)
@@ -50,8 +54,9 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
         # a custom container. The import will execute once then the sys.modeules
         # will be referenced to further calls.
 
+        rng = None if self._seed is None else MakeRng(self._seed, sample_id)
         generator_config, marginal_param, fixed_params = self.SampleConfig(
-            self._marginal
+            self._marginal, rng=rng
         )
         generator_config["generator_name"] = "StochasticBlockModel"
 
@@ -70,10 +75,13 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
             feature_dim=generator_config["feature_dim"],
             edge_center_distance=generator_config["edge_center_distance"],
             edge_feature_dim=generator_config["edge_feature_dim"],
-            out_degs=np.random.power(
+            out_degs=GetRng(rng).power(
                 generator_config["power_exponent"], generator_config["nvertex"]
             ),
             normalize_features=self._normalize_features,
+            seed=None
+            if self._seed is None
+            else MakeSeedSequence(self._seed, sample_id),
         )
 
         return {
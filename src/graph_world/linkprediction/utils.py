@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import dataclasses
-from typing import Dict, Tuple
+from typing import Dict, Tuple, Union
 
 import graph_tool
 import numpy as np
@@ -20,6 +20,8 @@ import torch
 from torch_geometric.data import Data
 from torch_geometric.utils import train_test_split_edges
 
+from ..generators.sbm_simulator import BidirectionalEdgeFeatures
+
 
 @dataclasses.dataclass
 class LinkPredictionDataset:
@@ -36,23 +38,16 @@ class LinkPredictionDataset:
 
     graph: graph_tool.Graph = Ellipsis
     node_features: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
     graph_memberships: np.ndarray = Ellipsis
 
 
 def linkprediction_data_to_torchgeo_data(
     linkprediction_data: LinkPredictionDataset, training_ratio, tuning_ratio
 ) -> Data:
-    edge_tuples = []
-    edge_feature_data = []
-    for edge in linkprediction_data.graph.iter_edges():
-        edge_tuples.append([edge[0], edge[1]])
-        edge_tuples.append([edge[1], edge[0]])
-        ordered_tuple = (edge[0], edge[1])
-        if edge[0] > edge[1]:
-            ordered_tuple = (edge[1], edge[0])
-        edge_feature_data.append(linkprediction_data.edge_features[ordered_tuple])
-        edge_feature_data.append(linkprediction_data.edge_features[ordered_tuple])
+    edge_tuples, edge_feature_data = BidirectionalEdgeFeatures(
+        linkprediction_data.graph, linkprediction_data.edge_features
+    )
 
     node_features = torch.tensor(linkprediction_data.node_features, dtype=torch.float)
     edge_index = torch.tensor(edge_tuples, dtype=torch.long)
@@ -0,0 +1,251 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Streaming reducers for per-graph metrics.
+
+Samples with many graphs (e.g. graph regression) produce one metrics dict per
+graph. The aggregators here reduce them one row or one batch of rows at a
+time, in memory independent of the number of graphs, and reproduce what
+pd.DataFrame(rows).mean() returns: missing metrics (NaN) are skipped, columns
+keep first-seen order, and infinite values make the mean infinite.
+
+MetricsDistribution also keeps min, max and quantile sketches (a merging
+t-digest, see QuantileSketch) per metric, still in fixed memory.
+"""
+
+import math
+from typing import Dict, Sequence
+
+import numpy as np
+
+
+class MetricsMoments:
+    """Per-metric count, mean and variance with Welford / Chan updates."""
+
+    def __init__(self):
+        self._names = []
+        self._index = {}
+        self._count = np.zeros(0)
+        self._mean = np.zeros(0)
+        self._m2 = np.zeros(0)
+        self._num_posinf = np.zeros(0)
+        self._num_neginf = np.zeros(0)
+
+    def _AddColumns(self, num_columns: int):
+        padding = np.zeros(num_columns)
+        self._count = np.concatenate([self._count, padding])
+        self._mean = np.concatenate([self._mean, padding])
+        self._m2 = np.concatenate([self._m2, padding])
+        self._num_posinf = np.concatenate([self._num_posinf, padding])
+        self._num_neginf = np.concatenate([self._num_neginf, padding])
+
+    def _Columns(self, names: Sequence[str]) -> np.ndarray:
+        new_names = [name for name in names if name not in self._index]
+        for name in new_names:
+            self._index[name] = len(self._names)
+            self._names.append(name)
+        if new_names:
+            self._AddColumns(len(new_names))
+        return np.array([self._index[name] for name in names], dtype=np.int64)
+
+    def AddRows(self, names: Sequence[str], values: np.ndarray):
+        """Adds a (num_rows, len(names)) batch of metric values.
+
+        Args:
+          names: metric name of each column.
+          values: metric values; NaN marks a metric missing from a row.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, len(names))
+        # Columns without any value are missing from every row of the batch.
+        keep = ~np.all(np.isnan(values), axis=0)
+        names = [name for name, kept in zip(names, keep) if kept]
+        if names:
+            self._Update(self._Columns(names), values[:, keep])
+
+    def _Update(self, columns: np.ndarray, values: np.ndarray):
+        self._num_posinf[columns] += np.sum(values == np.inf, axis=0)
+        self._num_neginf[columns] += np.sum(values == -np.inf, axis=0)
+        finite = np.isfinite(values)
+        count = np.sum(finite, axis=0).astype(np.float64)
+        present = count > 0
+        if not np.any(present):
+            return
+        values = np.where(finite, values, 0.0)
+        safe_count = np.maximum(count, 1.0)
+        mean = np.sum(values, axis=0) / safe_count
+        m2 = np.sum(np.where(finite, (values - mean) ** 2, 0.0), axis=0)
+        # Chan et al. pairwise merge of (count, mean, m2) into the totals.
+        columns, count, mean, m2 = (
+            columns[present],
+            count[present],
+            mean[present],
+            m2[present],
+        )
+        total = self._count[columns] + count
+        delta = mean - self._mean[columns]
+        self._mean[columns] += delta * count / total
+        self._m2[columns] += m2 + delta**2 * self._count[columns] * count / total
+        self._count[columns] = total
+
+    def AddRow(self, metrics: Dict[str, float]):
+        """Adds the metrics dict of one graph."""
+        self.AddRows(list(metrics), np.array([list(metrics.values())], dtype=float))
+
+    def Names(self):
+        """Returns metric names in first-seen order."""
+        return list(self._names)
+
+    def Means(self) -> Dict[str, float]:
+        """Returns the mean of each metric, like pd.DataFrame.mean()."""
+        mean = self._mean.copy()
+        mean[self._count == 0] = np.nan
+        mean[self._num_posinf > 0] = np.inf
+        mean[self._num_neginf > 0] = -np.inf
+        mean[(self._num_posinf > 0) & (self._num_neginf > 0)] = np.nan
+        return dict(zip(self._names, mean))
+
+    def Variances(self) -> Dict[str, float]:
+        """Returns the sample variance (ddof=1) of each metric.
+
+        Metrics with infinite values or fewer than two values have NaN.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = self._m2 / (self._count - 1.0)
+        variance[self._count < 2] = np.nan
+        variance[(self._num_posinf > 0) | (self._num_neginf > 0)] = np.nan
+        return dict(zip(self._names, variance))
+
+
+class QuantileSketch:
+    """Merging t-digest of a stream of finite floats.
+
+    Values are buffered and periodically merged into at most ~compression / 2
+    weighted centroids, sized by the arcsine scale function so that centroids
+    near the tails stay small. Quantile estimates are most accurate near
+    q = 0 and q = 1 (errors of order 1 / compression in q in the middle).
+    """
+
+    def __init__(self, compression: float = 100.0):
+        self._compression = compression
+        self._means = np.zeros(0)
+        self._weights = np.zeros(0)
+        self._buffer = []
+        self._buffer_size = 0
+        self._min = np.inf
+        self._max = -np.inf
+
+    def Add(self, values: np.ndarray):
+        """Adds finite values to the sketch."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if values.size == 0:
+            return
+        self._min = min(self._min, float(values.min()))
+        self._max = max(self._max, float(values.max()))
+        self._buffer.append(values)
+        self._buffer_size += values.size
+        if self._buffer_size >= 5 * self._compression:
+            self._Compress()
+
+    def _Scale(self, q: np.ndarray) -> np.ndarray:
+        return self._compression / (2.0 * math.pi) * np.arcsin(2.0 * q - 1.0)
+
+    def _Compress(self):
+        if not self._buffer:
+            return
+        means = np.concatenate([self._means] + self._buffer)
+        weights = np.concatenate(
+            [self._weights, np.ones(means.size - self._means.size)]
+        )
+        self._buffer, self._buffer_size = [], 0
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = np.sum(weights)
+        # A point joins the centroid of the unit k-interval its left edge
+        # falls in, which bounds every centroid's k-size by about one.
+        left = (np.cumsum(weights) - weights) / total
+        groups = np.floor(self._Scale(left) - self._Scale(0.0)).astype(np.int64)
+        _, groups = np.unique(groups, return_inverse=True)
+        self._weights = np.bincount(groups, weights=weights)
+        self._means = np.bincount(groups, weights=means * weights) / self._weights
+
+    def Count(self) -> float:
+        """Returns the number of values added."""
+        return float(np.sum(self._weights)) + self._buffer_size
+
+    def Quantile(self, q):
+        """Returns the estimated q-quantile(s), or NaN for an empty sketch."""
+        self._Compress()
+        q = np.asarray(q, dtype=np.float64)
+        if self._weights.size == 0:
+            return np.full(q.shape, np.nan)
+        total = np.sum(self._weights)
+        centers = np.cumsum(self._weights) - self._weights / 2.0
+        return np.interp(
+            q * total,
+            np.concatenate([[0.0], centers, [total]]),
+            np.concatenate([[self._min], self._means, [self._max]]),
+        )
+
+
+class MetricsDistribution(MetricsMoments):
+    """MetricsMoments plus per-metric min, max and quantile sketches."""
+
+    def __init__(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95), compression=100.0):
+        """
+        Args:
+          quantiles: quantiles reported by Summary().
+          compression: QuantileSketch compression; memory per metric is
+            O(compression).
+        """
+        super(MetricsDistribution, self).__init__()
+        self._quantiles = tuple(quantiles)
+        self._compression = compression
+        self._min = np.zeros(0)
+        self._max = np.zeros(0)
+        self._sketches = []
+
+    def _AddColumns(self, num_columns: int):
+        super(MetricsDistribution, self)._AddColumns(num_columns)
+        self._min = np.concatenate([self._min, np.full(num_columns, np.nan)])
+        self._max = np.concatenate([self._max, np.full(num_columns, np.nan)])
+        self._sketches.extend(
+            QuantileSketch(self._compression) for _ in range(num_columns)
+        )
+
+    def _Update(self, columns: np.ndarray, values: np.ndarray):
+        super(MetricsDistribution, self)._Update(columns, values)
+        with np.errstate(invalid="ignore"):
+            self._min[columns] = np.fmin(self._min[columns], np.nanmin(values, axis=0))
+            self._max[columns] = np.fmax(self._max[columns], np.nanmax(values, axis=0))
+        for column, column_values in zip(columns, values.T):
+            self._sketches[column].Add(column_values[np.isfinite(column_values)])
+
+    def Summary(self) -> Dict[str, float]:
+        """Returns means plus _std, _min, _max and _q<percent> of each metric.
+
+        Quantiles are over the finite values of a metric; infinite values
+        (e.g. diameters of disconnected graphs) only show in mean and max.
+        """
+        means = self.Means()
+        variances = self.Variances()
+        summary = {}
+        for index, name in enumerate(self._names):
+            summary[name] = means[name]
+            summary[name + "_std"] = float(np.sqrt(variances[name]))
+            summary[name + "_min"] = float(self._min[index])
+            summary[name + "_max"] = float(self._max[index])
+            for q, value in zip(
+                self._quantiles, self._sketches[index].Quantile(self._quantiles)
+            ):
+                summary["%s_q%02d" % (name, round(100 * q))] = float(value)
+        return summary
@@ -16,18 +16,52 @@ from typing import Dict
 import graph_tool
 import networkx as nx
 
+from .graph_metrics_approx import approximate_sparse_metrics
 from .graph_metrics_nx import graph_metrics_nx
+from .graph_metrics_sparse import adjacency_from_graph, sparse_metrics
+from .graph_summary import GraphSummary
 
 
-def graph_metrics(graph: graph_tool.Graph) -> Dict[str, float]:
+def graph_metrics(
+    graph: graph_tool.Graph,
+    backend: str = "networkx",
+    summary: GraphSummary = None,
+    **options
+) -> Dict[str, float]:
     """Computes graph metrics on a graph_tool graph object.
 
     Arguments:
-      graph: graph_tool graph.
+      graph: graph_tool graph. The "sparse" and "approximate" backends also
+        accept a SciPy sparse adjacency matrix or a (num_edges, 2) edge array.
+      backend: "networkx" converts the graph to networkx and runs
+        graph_metrics_nx. "sparse" runs graph_metrics_sparse on the graph
+        directly, producing the same metrics without the networkx round trip.
+        "approximate" runs graph_metrics_approximate, which samples the
+        diameter, clustering and triangle metrics and reports error bounds.
+      summary: optional GraphSummary of graph, whose edge array and adjacency
+        are reused instead of being rebuilt from graph.
+      **options: keyword arguments of graph_metrics_approximate (num_bfs,
+        num_wedge_samples, confidence, seed). Only the "approximate" backend
+        takes options.
     Returns:
       dict from metric names to metric values.
     """
+    if backend not in ("networkx", "sparse", "approximate"):
+        raise ValueError("backend must be 'networkx', 'sparse' or 'approximate'")
+    if options and backend != "approximate":
+        raise ValueError("only the 'approximate' backend takes metrics options")
+    if backend != "networkx":
+        if summary is not None:
+            adjacency = summary.metrics_adjacency
+        else:
+            adjacency = adjacency_from_graph(graph)
+        if backend == "sparse":
+            return sparse_metrics(adjacency)
+        return approximate_sparse_metrics(adjacency, **options)
     nx_graph = nx.Graph()
-    edge_list = [(int(e.source()), int(e.target())) for e in graph.edges()]
-    nx_graph.add_edges_from(edge_list)
+    if summary is not None:
+        nx_graph.add_edges_from(summary.edges.tolist())
+    else:
+        edge_list = [(int(e.source()), int(e.target())) for e in graph.edges()]
+        nx_graph.add_edges_from(edge_list)
     return graph_metrics_nx(nx_graph)
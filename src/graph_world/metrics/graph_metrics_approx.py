@@ -0,0 +1,198 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Sampled estimates of the expensive graph metrics, with error bounds.
+
+Exact diameter needs a BFS from every node and exact triangle counts need
+sum(degree^2) work, which dominates metrics time on large graphs. This module
+computes the graph_metrics_sparse metrics with those replaced by estimates:
+
+  approximate_diameter: the largest eccentricity found by num_bfs k-BFS
+    double sweeps. It is a lower bound on the diameter; twice the smallest
+    eccentricity seen is an upper bound, reported as
+    approximate_diameter_upper_bound.
+  transitivity, num_triangles: wedge sampling. Wedges (paths of length two)
+    are drawn uniformly and the closed fraction estimates transitivity;
+    num_triangles is transitivity * num_wedges / 3.
+  avg_cc: one random wedge per uniformly sampled node; a closed wedge is a
+    Bernoulli draw with mean equal to that node's clustering coefficient.
+
+Each sampled estimate is a mean of num_wedge_samples independent [0, 1]
+variables, so by Hoeffding's inequality it is within
+eps = sqrt(ln(2 / (1 - confidence)) / (2 * num_wedge_samples)) of its exact
+value with probability at least `confidence`. The half-widths are reported as
+avg_cc_error, transitivity_error and num_triangles_error. All other metrics
+are exact.
+"""
+
+import math
+from typing import Dict
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from .graph_metrics_sparse import adjacency_from_graph, sparse_metrics
+
+
+def hoeffding_error(num_samples: int, confidence: float) -> float:
+    """Returns the half-width of a Hoeffding interval for a mean of [0, 1] draws."""
+    if num_samples <= 0:
+        return 1.0
+    return math.sqrt(math.log(2.0 / (1.0 - confidence)) / (2.0 * num_samples))
+
+
+def _eccentricities(adjacency: sp.csr_matrix, sources: np.ndarray) -> np.ndarray:
+    distances = csgraph.shortest_path(
+        adjacency, unweighted=True, directed=False, indices=sources
+    )
+    return distances.reshape(len(sources), -1)
+
+
+def _diameter_bounds(
+    adjacency: sp.csr_matrix, num_components: int, num_bfs: int, rng
+) -> Dict[str, float]:
+    """Bounds the diameter with num_bfs double sweeps (2 * num_bfs BFS runs)."""
+    num_nodes = adjacency.shape[0]
+    if num_nodes == 0:
+        return {"approximate_diameter": 0.0, "approximate_diameter_upper_bound": 0.0}
+    if num_components > 1:
+        return {
+            "approximate_diameter": np.inf,
+            "approximate_diameter_upper_bound": np.inf,
+        }
+    num_bfs = min(max(num_bfs, 1), num_nodes)
+    sources = rng.choice(num_nodes, size=num_bfs, replace=False)
+    distances = _eccentricities(adjacency, sources)
+    upper = 2.0 * float(distances.max(axis=1).min())
+    # Second sweep: BFS again from the farthest node of each first sweep.
+    sweep_distances = _eccentricities(adjacency, distances.argmax(axis=1))
+    lower = max(float(distances.max()), float(sweep_distances.max()))
+    upper = min(upper, 2.0 * float(sweep_distances.max(axis=1).min()))
+    return {"approximate_diameter": lower, "approximate_diameter_upper_bound": upper}
+
+
+def _closed_wedges(
+    adjacency: sp.csr_matrix, centers: np.ndarray, degrees: np.ndarray, rng
+) -> np.ndarray:
+    """Draws one uniform wedge at each center and returns which are closed."""
+    num_nodes = adjacency.shape[0]
+    center_degrees = degrees[centers]
+    first = np.floor(rng.random(len(centers)) * center_degrees).astype(np.int64)
+    second = np.floor(rng.random(len(centers)) * (center_degrees - 1)).astype(np.int64)
+    second += second >= first
+    starts = adjacency.indptr[centers]
+    u = adjacency.indices[starts + first].astype(np.int64)
+    v = adjacency.indices[starts + second].astype(np.int64)
+    # Rows of a canonical CSR matrix are sorted, so the flattened (row, col)
+    # keys are too and membership is a binary search.
+    keys = (
+        np.repeat(np.arange(num_nodes, dtype=np.int64), np.diff(adjacency.indptr))
+        * num_nodes
+        + adjacency.indices
+    )
+    queries = u * num_nodes + v
+    positions = np.minimum(np.searchsorted(keys, queries), len(keys) - 1)
+    return keys[positions] == queries
+
+
+def _sampled_clustering(
+    adjacency: sp.csr_matrix,
+    degrees: np.ndarray,
+    num_wedge_samples: int,
+    confidence: float,
+    rng,
+) -> Dict[str, float]:
+    """Estimates avg_cc, transitivity and num_triangles by wedge sampling."""
+    adjacency.sort_indices()
+    degrees = degrees.astype(np.int64)
+    node_wedges = degrees * (degrees - 1) / 2.0
+    num_wedges = float(np.sum(node_wedges))
+    error = hoeffding_error(num_wedge_samples, confidence)
+    if num_wedges == 0:
+        return {
+            "avg_cc": 0.0,
+            "transitivity": 0.0,
+            "num_triangles": 0.0,
+            "avg_cc_error": 0.0,
+            "transitivity_error": 0.0,
+            "num_triangles_error": 0.0,
+        }
+
+    centers = rng.choice(
+        adjacency.shape[0], size=num_wedge_samples, p=node_wedges / num_wedges
+    )
+    transitivity = float(np.mean(_closed_wedges(adjacency, centers, degrees, rng)))
+
+    # Nodes with fewer than two neighbors have clustering 0 and no wedge.
+    nodes = rng.integers(adjacency.shape[0], size=num_wedge_samples)
+    nodes = nodes[degrees[nodes] >= 2]
+    avg_cc = float(np.sum(_closed_wedges(adjacency, nodes, degrees, rng)))
+    avg_cc /= num_wedge_samples
+
+    return {
+        "avg_cc": avg_cc,
+        "transitivity": transitivity,
+        "num_triangles": transitivity * num_wedges / 3.0,
+        "avg_cc_error": error,
+        "transitivity_error": error,
+        "num_triangles_error": error * num_wedges / 3.0,
+    }
+
+
+def approximate_sparse_metrics(
+    adjacency: sp.csr_matrix,
+    num_bfs: int = 8,
+    num_wedge_samples: int = 20000,
+    confidence: float = 0.95,
+    seed: int = None,
+) -> Dict[str, float]:
+    """graph_metrics_approximate on an adjacency_from_graph style matrix."""
+    rng = np.random.default_rng(seed)
+    return sparse_metrics(
+        adjacency,
+        diameter_fn=lambda adjacency, num_components: _diameter_bounds(
+            adjacency, num_components, num_bfs, rng
+        ),
+        clustering_fn=lambda adjacency, degrees: _sampled_clustering(
+            adjacency, degrees, num_wedge_samples, confidence, rng
+        ),
+    )
+
+
+def graph_metrics_approximate(
+    graph,
+    num_bfs: int = 8,
+    num_wedge_samples: int = 20000,
+    confidence: float = 0.95,
+    seed: int = None,
+) -> Dict[str, float]:
+    """Computes graph_metrics_sparse metrics with sampled diameter and clustering.
+
+    Arguments:
+      graph: graph_tool graph, SciPy sparse adjacency matrix (e.g. CSR), or
+        (num_edges, 2) int edge array.
+      num_bfs: number of double sweeps bounding the diameter.
+      num_wedge_samples: number of wedges sampled for transitivity and
+        num_triangles, and of nodes sampled for avg_cc.
+      confidence: probability with which each sampled metric lies within its
+        reported *_error of the exact value.
+      seed: seed of the sampling RNG. If None, fresh OS entropy is used.
+    Returns:
+      dict from metric names to metric values. Besides the graph_metrics_nx
+      keys it holds approximate_diameter_upper_bound, avg_cc_error,
+      transitivity_error and num_triangles_error.
+    """
+    return approximate_sparse_metrics(
+        adjacency_from_graph(graph), num_bfs, num_wedge_samples, confidence, seed
+    )
@@ -0,0 +1,273 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""graph_metrics_sparse for many small graphs at once.
+
+All graphs of a sample are placed on the diagonal of one sparse adjacency
+matrix, so degrees, triangles, components and core numbers of every graph come
+from a single call each, and per-graph metrics are segment reductions
+(np.bincount / ufunc.reduceat) over the node -> graph map. Diameters come from
+iterated sparse reachability products over groups of graphs.
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from .graph_metrics_sparse import (
+    _core_numbers,
+    _diameter,
+    _edge_array,
+    _MAX_DISTANCE_BLOCK,
+)
+
+# Keys of graph_metrics_nx, in its order.
+METRIC_NAMES = [
+    "num_nodes",
+    "num_edges",
+    "edge_density",
+    "degree_gini",
+    "approximate_diameter",
+    "avg_degree",
+    "coreness_eq_1",
+    "coreness_geq_2",
+    "coreness_geq_5",
+    "coreness_geq_10",
+    "coreness_gini",
+    "avg_cc",
+    "transitivity",
+    "num_triangles",
+    "cc_size",
+    "power_law_estimate",
+]
+
+# Metrics graph_metrics_nx returns for a graph without edges.
+_EMPTY_GRAPH_METRICS = METRIC_NAMES[:6]
+
+
+def _block_diagonal_adjacency(graphs) -> Tuple[sp.csr_matrix, np.ndarray]:
+    """Stacks adjacency_from_graph of every graph on a block diagonal.
+
+    Returns:
+      adjacency: symmetric 0/1 CSR matrix over the non-isolated nodes of all
+        graphs, ordered by graph and by node id within a graph.
+      node_graph: (num_nodes,) index of the graph of each node.
+    """
+    edge_arrays = [_edge_array(graph).astype(np.int64) for graph in graphs]
+    sizes = np.array(
+        [edges.max() + 1 if edges.size else 0 for edges in edge_arrays],
+        dtype=np.int64,
+    )
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    edge_graph = np.repeat(
+        np.arange(len(graphs)), [edges.shape[0] for edges in edge_arrays]
+    )
+    edges = np.concatenate([np.zeros((0, 2), np.int64)] + edge_arrays)
+    edges = edges + offsets[edge_graph][:, None]
+    nodes, edges = np.unique(edges, return_inverse=True)
+    edges = edges.reshape(-1, 2)
+    num_nodes = nodes.shape[0]
+    edges = np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1)
+    keys = np.unique(edges[:, 0] * num_nodes + edges[:, 1])
+    u, v = np.divmod(keys, max(num_nodes, 1))
+    rows = np.concatenate([u, v])
+    cols = np.concatenate([v, u])
+    data = np.ones(rows.shape[0], dtype=np.int64)
+    adjacency = sp.csr_matrix((data, (rows, cols)), shape=(num_nodes, num_nodes))
+    node_graph = np.searchsorted(offsets, nodes, side="right") - 1
+    return adjacency, node_graph
+
+
+def _segment_gini(values: np.ndarray, node_graph: np.ndarray, num_nodes):
+    """_gini_coefficient of each graph's values (graphs with nodes only)."""
+    values = values.astype(np.float32) + np.finfo(np.float32).eps
+    order = np.lexsort((values, node_graph))
+    values = values[order].astype(np.float64)
+    starts = np.concatenate([[0], np.cumsum(num_nodes)])[node_graph]
+    index = np.arange(1, values.shape[0] + 1) - starts
+    n = num_nodes[node_graph]
+    weighted = np.bincount(
+        node_graph, weights=(2 * index - n - 1) * values, minlength=len(num_nodes)
+    )
+    totals = np.bincount(node_graph, weights=values, minlength=len(num_nodes))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return weighted / (num_nodes * totals)
+
+
+def _reach_diameters(adjacency: sp.csr_matrix, node_graph, num_graphs):
+    """Eccentricity maximum of each connected graph by reachability products.
+
+    Row v of reach_k holds the nodes within distance k of v; a graph's
+    diameter is the last k at which its reach count still grows.
+    """
+    num_nodes = adjacency.shape[0]
+    step = (adjacency + sp.identity(num_nodes, dtype=np.int64, format="csr")).tocsr()
+    reach = sp.identity(num_nodes, dtype=np.int64, format="csr")
+    row_graph = node_graph
+    counts = np.bincount(row_graph, minlength=num_graphs)
+    diameters = np.zeros(num_graphs)
+    distance = 0
+    while True:
+        reach = (reach @ step).tocsr()
+        reach.data[:] = 1
+        distance += 1
+        row_graph = np.repeat(node_graph, np.diff(reach.indptr))
+        new_counts = np.bincount(row_graph, minlength=num_graphs)
+        grew = new_counts > counts
+        if not np.any(grew):
+            return diameters
+        diameters[grew] = distance
+        counts = new_counts
+
+
+def _diameters(adjacency, node_graph, num_nodes, connected):
+    """Diameter of each graph with nodes, as _diameter computes it."""
+    diameters = np.where(connected, 0.0, np.inf)
+    starts = np.concatenate([[0], np.cumsum(num_nodes)])
+    # Consecutive graphs are grouped so a group's reach matrix has at most
+    # _MAX_DISTANCE_BLOCK entries; larger graphs use blocked BFS on their own.
+    groups = [[]]
+    group_size = 0
+    for graph_index in np.flatnonzero(num_nodes > 0):
+        size = int(num_nodes[graph_index]) ** 2
+        if size > _MAX_DISTANCE_BLOCK:
+            if connected[graph_index]:
+                begin, end = starts[graph_index], starts[graph_index + 1]
+                diameters[graph_index] = _diameter(adjacency[begin:end, begin:end], 1)
+            groups.append([])
+            group_size = 0
+            continue
+        if group_size + size > _MAX_DISTANCE_BLOCK:
+            groups.append([])
+            group_size = 0
+        groups[-1].append(graph_index)
+        group_size += size
+    for group in groups:
+        if not group:
+            continue
+        first, last = group[0], group[-1]
+        begin, end = starts[first], starts[last + 1]
+        sub_diameters = _reach_diameters(
+            adjacency[begin:end, begin:end],
+            node_graph[begin:end] - first,
+            last - first + 1,
+        )
+        group = np.array(group)
+        diameters[group] = np.where(
+            connected[group], sub_diameters[group - first], np.inf
+        )
+    return diameters
+
+
+def graph_metrics_batched(graphs: Sequence) -> Tuple[List[str], np.ndarray]:
+    """Computes graph_metrics_sparse of every graph in one batched pass.
+
+    Arguments:
+      graphs: sequence of graph_tool graphs, SciPy sparse adjacency matrices
+        or (num_edges, 2) int edge arrays.
+    Returns:
+      names: METRIC_NAMES.
+      values: (len(graphs), len(names)) float64 array; row i holds the
+        graph_metrics_sparse values of graphs[i], with NaN for the metrics
+        it omits for graphs without edges.
+    """
+    num_graphs = len(graphs)
+    values = np.full((num_graphs, len(METRIC_NAMES)), np.nan)
+    column = {name: i for i, name in enumerate(METRIC_NAMES)}
+    adjacency, node_graph = _block_diagonal_adjacency(graphs)
+
+    def per_graph(node_values):
+        return np.bincount(node_graph, weights=node_values, minlength=num_graphs)
+
+    num_nodes = np.bincount(node_graph, minlength=num_graphs)
+    has_nodes = num_nodes > 0
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel().astype(np.float32)
+    num_edges = per_graph(degrees)
+    edge_density = np.zeros(num_graphs)
+    dense_enough = num_nodes > 1
+    edge_density[dense_enough] = (
+        num_edges[dense_enough]
+        / num_nodes[dense_enough]
+        / (num_nodes[dense_enough] - 1.0)
+    )
+    values[:, column["num_nodes"]] = num_nodes
+    values[:, column["num_edges"]] = num_edges
+    values[:, column["edge_density"]] = edge_density
+    values[:, column["degree_gini"]] = np.where(
+        has_nodes, _segment_gini(degrees, node_graph, num_nodes), 0.0
+    )
+
+    num_components, components = csgraph.connected_components(adjacency, directed=False)
+    component_graph = np.zeros(num_components, dtype=np.int64)
+    component_graph[components] = node_graph
+    connected = np.bincount(component_graph, minlength=num_graphs) == 1
+    values[:, column["approximate_diameter"]] = _diameters(
+        adjacency, node_graph, num_nodes, connected
+    )
+    values[:, column["approximate_diameter"]][~has_nodes] = 0.0
+    values[:, column["avg_degree"]] = 0.0
+    if not np.any(has_nodes):
+        return list(METRIC_NAMES), values
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values[:, column["avg_degree"]] = np.where(
+            has_nodes, num_edges / num_nodes, 0.0
+        )
+        core_numbers = _core_numbers(adjacency)
+        for name, is_core in [
+            ("coreness_eq_1", core_numbers == 1),
+            ("coreness_geq_2", core_numbers >= 2),
+            ("coreness_geq_5", core_numbers >= 5),
+            ("coreness_geq_10", core_numbers >= 10),
+        ]:
+            values[:, column[name]] = per_graph(is_core) / num_nodes
+        values[:, column["coreness_gini"]] = _segment_gini(
+            core_numbers, node_graph, num_nodes
+        )
+
+        node_triangles = (
+            np.asarray(adjacency.multiply(adjacency @ adjacency).sum(axis=1)).ravel()
+            / 2.0
+        )
+        wedges = degrees.astype(np.float64) * (degrees - 1.0)
+        clustering = np.divide(
+            2.0 * node_triangles,
+            wedges,
+            out=np.zeros(adjacency.shape[0]),
+            where=wedges > 0,
+        )
+        graph_triangles = per_graph(node_triangles)
+        values[:, column["avg_cc"]] = per_graph(clustering) / num_nodes
+        values[:, column["transitivity"]] = np.where(
+            graph_triangles == 0, 0.0, 2.0 * graph_triangles / per_graph(wedges)
+        )
+        values[:, column["num_triangles"]] = graph_triangles / 3.0
+
+        component_sizes = np.bincount(components)
+        largest = np.zeros(num_graphs)
+        np.maximum.at(largest, component_graph, component_sizes)
+        values[:, column["cc_size"]] = largest / num_nodes
+
+        shifted = degrees + np.float32(1.0)
+        starts = np.concatenate([[0], np.cumsum(num_nodes)])[:-1][has_nodes]
+        min_degrees = np.zeros(num_graphs, dtype=np.float32)
+        min_degrees[has_nodes] = np.minimum.reduceat(shifted, starts)
+        log_ratios = np.log(shifted / min_degrees[node_graph])
+        values[:, column["power_law_estimate"]] = 1.0 + num_nodes / per_graph(
+            log_ratios
+        )
+
+    values[~has_nodes, len(_EMPTY_GRAPH_METRICS) :] = np.nan
+    return list(METRIC_NAMES), values
@@ -0,0 +1,177 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from typing import Callable, Dict
+
+import graph_tool
+import graph_tool.topology
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+
+from .graph_metrics_nx import _gini_coefficient, _power_law_estimate
+
+# Upper bound on the number of BFS distances held in memory at once.
+_MAX_DISTANCE_BLOCK = 2**24
+
+
+def _edge_array(graph) -> np.ndarray:
+    """Returns the (num_edges, 2) edge array of a supported graph input."""
+    if isinstance(graph, graph_tool.Graph):
+        return graph.get_edges()[:, :2]
+    if sp.issparse(graph):
+        graph = graph.tocoo()
+        return np.stack([graph.row, graph.col], axis=1)
+    return np.asarray(graph).reshape(-1, 2)
+
+
+def adjacency_from_graph(graph) -> sp.csr_matrix:
+    """Builds the symmetric 0/1 adjacency matrix used by graph_metrics_sparse.
+
+    Like the networkx graph built in graph_metrics, nodes are the endpoints of
+    the edges (isolated vertices are dropped) and parallel edges collapse.
+    Self-loops are dropped.
+    """
+    nodes, edges = np.unique(_edge_array(graph), return_inverse=True)
+    edges = edges.reshape(-1, 2)
+    num_nodes = nodes.shape[0]
+    edges = np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1)
+    keys = np.unique(edges[:, 0].astype(np.int64) * num_nodes + edges[:, 1])
+    u, v = np.divmod(keys, max(num_nodes, 1))
+    rows = np.concatenate([u, v])
+    cols = np.concatenate([v, u])
+    data = np.ones(rows.shape[0], dtype=np.int64)
+    return sp.csr_matrix((data, (rows, cols)), shape=(num_nodes, num_nodes))
+
+
+def _diameter(adjacency: sp.csr_matrix, num_components: int) -> float:
+    """Computes the exact diameter with blocked BFS from every node."""
+    num_nodes = adjacency.shape[0]
+    if num_nodes == 0:
+        return 0.0
+    if num_components > 1:
+        return np.inf
+    block = max(1, _MAX_DISTANCE_BLOCK // num_nodes)
+    diameter = 0.0
+    for start in range(0, num_nodes, block):
+        distances = csgraph.shortest_path(
+            adjacency,
+            unweighted=True,
+            directed=False,
+            indices=np.arange(start, min(start + block, num_nodes)),
+        )
+        diameter = max(diameter, float(distances.max()))
+    return diameter
+
+
+def _core_numbers(adjacency: sp.csr_matrix) -> np.ndarray:
+    """Computes k-core numbers with graph_tool's kcore_decomposition."""
+    graph = graph_tool.Graph(directed=False)
+    graph.add_vertex(adjacency.shape[0])
+    upper = sp.triu(adjacency, k=1).tocoo()
+    graph.add_edge_list(np.stack([upper.row, upper.col], axis=1))
+    return graph_tool.topology.kcore_decomposition(graph).a.copy()
+
+
+def _clustering(adjacency: sp.csr_matrix, degrees: np.ndarray) -> Dict[str, float]:
+    """Computes exact avg_cc, transitivity and num_triangles."""
+    # Row sums of A * (A @ A) count every triangle at a node twice.
+    node_triangles = (
+        np.asarray(adjacency.multiply(adjacency @ adjacency).sum(axis=1)).ravel() / 2.0
+    )
+    wedges = degrees.astype(np.float64) * (degrees - 1.0)
+    clustering = np.divide(
+        2.0 * node_triangles,
+        wedges,
+        out=np.zeros(adjacency.shape[0]),
+        where=wedges > 0,
+    )
+    total_triangles = np.sum(node_triangles)
+    return {
+        "avg_cc": float(np.mean(clustering)),
+        "transitivity": (
+            0.0
+            if total_triangles == 0
+            else float(2.0 * total_triangles / np.sum(wedges))
+        ),
+        "num_triangles": float(total_triangles / 3.0),
+    }
+
+
+def sparse_metrics(
+    adjacency: sp.csr_matrix,
+    diameter_fn: Callable = _diameter,
+    clustering_fn: Callable = _clustering,
+) -> Dict[str, float]:
+    """Computes the graph_metrics_nx metrics of a symmetric adjacency matrix.
+
+    Arguments:
+      adjacency: symmetric 0/1 CSR matrix without self-loops or isolated nodes.
+      diameter_fn: called as diameter_fn(adjacency, num_components); returns
+        the approximate_diameter value or a dict of diameter metrics.
+      clustering_fn: called as clustering_fn(adjacency, degrees); returns a dict
+        with avg_cc, transitivity and num_triangles (and possibly more).
+    Returns:
+      dict from metric names to metric values.
+    """
+    num_nodes = adjacency.shape[0]
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel().astype(np.float32)
+
+    num_edges = float(adjacency.nnz)  # counts both directions
+    edge_density = 0.0
+    if num_nodes > 1:
+        edge_density = num_edges / num_nodes / (num_nodes - 1.0)
+    result = {
+        "num_nodes": float(num_nodes),
+        "num_edges": num_edges,
+        "edge_density": edge_density,
+    }
+    result["degree_gini"] = _gini_coefficient(degrees)
+    num_components, components = csgraph.connected_components(adjacency, directed=False)
+    diameter = diameter_fn(adjacency, num_components)
+    if isinstance(diameter, dict):
+        result.update(diameter)
+    else:
+        result["approximate_diameter"] = diameter
+    if num_nodes == 0:  # avoid np.mean of empty slice
+        result["avg_degree"] = 0.0
+        return result
+    result["avg_degree"] = float(np.mean(degrees))
+    core_numbers = _core_numbers(adjacency)
+    result["coreness_eq_1"] = float(np.mean(core_numbers == 1))
+    result["coreness_geq_2"] = float(np.mean(core_numbers >= 2))
+    result["coreness_geq_5"] = float(np.mean(core_numbers >= 5))
+    result["coreness_geq_10"] = float(np.mean(core_numbers >= 10))
+    result["coreness_gini"] = float(_gini_coefficient(core_numbers))
+    result.update(clustering_fn(adjacency, degrees))
+    result["cc_size"] = float(np.max(np.bincount(components)) / num_nodes)
+    result["power_law_estimate"] = _power_law_estimate(degrees)
+    return result
+
+
+def graph_metrics_sparse(graph) -> Dict[str, float]:
+    """Computes the graph_metrics_nx metrics without building a networkx graph.
+
+    Degrees, triangles, clustering and components come from SciPy sparse
+    routines on the adjacency matrix, core numbers from graph_tool. The result
+    has the same keys and values as graph_metrics_nx on the networkx graph that
+    graph_metrics builds from the same edges.
+
+    Arguments:
+      graph: graph_tool graph, SciPy sparse adjacency matrix (e.g. CSR), or
+        (num_edges, 2) int edge array.
+    Returns:
+      dict from metric names to metric values.
+    """
+    return sparse_metrics(adjacency_from_graph(graph))
@@ -0,0 +1,115 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Per-graph structures shared by graph_metrics and NodeLabelMetrics.
+
+The metric functions of a sample all start from the same few views of the
+graph: its edge array, a sparse adjacency matrix, the degree vector and, for
+labeled graphs, per-label tallies. GraphSummary builds each view at most once,
+on first use, so a sample pays for them once however many metrics read them.
+"""
+
+import functools
+
+import numpy as np
+import scipy.sparse as sp
+
+
+class GraphSummary:
+    """Lazily computed views of a graph_tool graph and its node labels."""
+
+    def __init__(self, graph, labels=None):
+        """
+        Args:
+          graph: graph_tool graph.
+          labels: optional (num_vertices,) int array of node labels in
+            0..num_labels-1.
+        """
+        self.graph = graph
+        self.num_vertices = graph.num_vertices()
+        self.directed = graph.is_directed()
+        self.labels = None if labels is None else np.asarray(labels)
+
+    @functools.cached_property
+    def edges(self):
+        """(num_edges, 2) int64 array of graph.get_edges() (source, target)."""
+        return self.graph.get_edges()[:, :2].astype(np.int64)
+
+    @functools.cached_property
+    def degrees(self):
+        """Out-degree of every vertex, as graph.get_out_degrees returns it."""
+        return self.graph.get_out_degrees(self.graph.get_vertices())
+
+    @functools.cached_property
+    def adjacency(self):
+        """Sparsity pattern of graph_tool.spectral.adjacency as a 0/1 CSR matrix.
+
+        Entry (target, source) is set for every edge, and (source, target) as
+        well if the graph is undirected. Parallel edges collapse and
+        self-loops are kept.
+        """
+        n = self.num_vertices
+        pairs = self.edges[:, ::-1]
+        if not self.directed:
+            pairs = np.concatenate([pairs, self.edges])
+        rows, cols = np.divmod(np.unique(pairs[:, 0] * n + pairs[:, 1]), max(n, 1))
+        data = np.ones(rows.shape[0], dtype=np.int64)
+        return sp.csr_matrix((data, (rows, cols)), shape=(n, n))
+
+    @functools.cached_property
+    def metrics_adjacency(self):
+        """Symmetric adjacency of the networkx graph built by graph_metrics.
+
+        Like adjacency_from_graph in graph_metrics_sparse: vertices without
+        edges are dropped, the rest keep their order, and self-loops are
+        dropped after deciding which vertices to keep.
+        """
+        adjacency = self.adjacency
+        if self.directed:
+            adjacency = adjacency.maximum(adjacency.T).tocsr()
+        nodes = np.flatnonzero(np.diff(adjacency.indptr))
+        adjacency = adjacency[nodes][:, nodes].tocoo()
+        keep = adjacency.row != adjacency.col
+        adjacency = sp.csr_matrix(
+            (adjacency.data[keep], (adjacency.row[keep], adjacency.col[keep])),
+            shape=adjacency.shape,
+        )
+        return adjacency
+
+    @functools.cached_property
+    def _label_index(self):
+        return np.unique(self.labels, return_inverse=True)[1].ravel()
+
+    @functools.cached_property
+    def label_sizes(self):
+        """Number of vertices with each label present, in label order."""
+        return np.bincount(self._label_index)
+
+    @functools.cached_property
+    def label_degrees(self):
+        """Sum of the degrees of the vertices with each label present."""
+        return np.bincount(self._label_index, weights=self.degrees)
+
+    @functools.cached_property
+    def edge_count_matrix(self):
+        """(num_labels, num_labels) int32 counts of adjacency nonzeros by label.
+
+        Entry (k1, k2) counts nonzeros (v1, v2) of adjacency with labels k1
+        and k2; diagonal entries are doubled.
+        """
+        k = len(set(self.labels))
+        adjacency = self.adjacency.tocoo()
+        pair_labels = self.labels[adjacency.row] * k + self.labels[adjacency.col]
+        edge_counts = np.bincount(pair_labels, minlength=k * k).reshape(k, k)
+        edge_counts[np.diag_indices(k)] *= 2
+        return edge_counts.astype(np.int32)
@@ -0,0 +1,105 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Graph and node label metrics of one labeled graph, optionally cached.
+
+LabeledGraphMetricsDoFn holds the metrics settings shared by the node
+classification, link prediction and node regression handlers. Each task
+subclasses it with a process method that stores ComputeMetrics(data) in its
+elements.
+"""
+
+import apache_beam as beam
+import numpy as np
+
+from .graph_metrics import graph_metrics
+from .graph_summary import GraphSummary
+from .metrics_cache import cached_metrics, metrics_cache_dir, MetricsCache
+from .node_label_metrics import check_feature_homogeneity_method, NodeLabelMetrics
+
+
+class LabeledGraphMetricsDoFn(beam.DoFn):
+    def __init__(
+        self,
+        metrics_backend="networkx",
+        metrics_options=None,
+        feature_homogeneity_method="exact",
+        feature_homogeneity_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
+    ):
+        """
+        Args:
+          metrics_backend: graph_metrics backend.
+          metrics_options: dict of keyword arguments for the backend.
+          feature_homogeneity_method: NodeLabelMetrics method.
+          feature_homogeneity_options: NodeLabelMetrics method options.
+          cache_metrics: if True, metrics are cached by SetOutputPath's cache.
+          metrics_cache_dir: cache directory; <output>/metrics_cache if None.
+        Raises:
+          ValueError: if NodeLabelMetrics rejects the feature homogeneity
+            method or options.
+        """
+        check_feature_homogeneity_method(
+            feature_homogeneity_method, feature_homogeneity_options
+        )
+        self._metrics_backend = metrics_backend
+        self._metrics_options = metrics_options or {}
+        self._feature_homogeneity_method = feature_homogeneity_method
+        self._feature_homogeneity_options = feature_homogeneity_options
+        self._cache_metrics = cache_metrics
+        self._metrics_cache_dir = metrics_cache_dir
+        self._metrics_cache = None
+
+    def SetOutputPath(self, output_path):
+        if self._cache_metrics:
+            self._metrics_cache = MetricsCache(
+                metrics_cache_dir(output_path, self._metrics_cache_dir)
+            )
+
+    def _ComputeMetrics(self, data):
+        summary = GraphSummary(data.graph, data.graph_memberships)
+        metrics = graph_metrics(
+            data.graph, self._metrics_backend, summary, **self._metrics_options
+        )
+        metrics.update(
+            NodeLabelMetrics(
+                data.graph,
+                data.graph_memberships,
+                data.node_features,
+                self._feature_homogeneity_method,
+                self._feature_homogeneity_options,
+                summary,
+            )
+        )
+        return metrics
+
+    def ComputeMetrics(self, data):
+        """Returns the metrics dict of a dataset with graph, graph_memberships
+        and node_features attributes, through the cache if there is one."""
+        return cached_metrics(
+            self._metrics_cache,
+            [
+                data.graph.get_edges(),
+                np.array([data.graph.num_vertices()]),
+                data.graph_memberships,
+                data.node_features,
+            ],
+            [
+                self._metrics_backend,
+                self._metrics_options,
+                self._feature_homogeneity_method,
+                self._feature_homogeneity_options,
+            ],
+            lambda: self._ComputeMetrics(data),
+        )
@@ -0,0 +1,127 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""On-disk cache of per-sample metrics, keyed by graph content.
+
+A rerun of a pipeline with the same generator seeds produces the same graphs,
+so their metrics can be read back instead of recomputed. Entries are JSON
+files named by the SHA-256 of the graph arrays (edges, labels, features, ...),
+of the metrics configuration and of METRICS_CACHE_VERSION. They are written
+through Beam's FileSystems, so the cache works on local disk and on cloud
+storage alike.
+"""
+
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+from apache_beam.io.filesystems import FileSystems
+
+# Salt of every cache key. Bump it whenever the stored metrics change for the
+# same inputs (new or redefined metrics, a different file format), so stale
+# entries are no longer hit.
+METRICS_CACHE_VERSION = 1
+
+
+def metrics_cache_key(arrays: Sequence[np.ndarray], config=None) -> str:
+    """Returns a stable hex digest of arrays and a JSON-serializable config.
+
+    Arguments:
+      arrays: arrays that determine the metrics (None entries are allowed).
+        Dtype and shape are part of the key, so e.g. int32 and int64 edges
+        hash differently.
+      config: metric settings (backend, options, ...) that change the values.
+    Returns:
+      64-character hex string, which also depends on METRICS_CACHE_VERSION.
+    """
+    digest = hashlib.sha256()
+    digest.update(b"graph_world.metrics_cache.v%d" % METRICS_CACHE_VERSION)
+    digest.update(json.dumps(config, sort_keys=True, default=repr).encode())
+    for array in arrays:
+        if array is None:
+            digest.update(b"none")
+            continue
+        array = np.ascontiguousarray(array)
+        digest.update(("%s%s" % (array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("%r is not JSON serializable" % (value,))
+
+
+class MetricsCache:
+    """Metrics dicts stored as <cache_dir>/<key>.json."""
+
+    def __init__(self, cache_dir: str):
+        self._cache_dir = cache_dir
+
+    def _Path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, key + ".json")
+
+    def Get(self, key: str) -> Optional[Dict[str, float]]:
+        """Returns the cached metrics for key, or None on a miss."""
+        path = self._Path(key)
+        if not FileSystems.exists(path):
+            return None
+        try:
+            with FileSystems.open(path) as f:
+                return json.loads(f.read().decode())
+        except ValueError:  # a partially written entry counts as a miss
+            return None
+
+    def Put(self, key: str, metrics: Dict[str, float]):
+        """Stores metrics under key."""
+        with FileSystems.create(self._Path(key), "application/json") as f:
+            f.write(json.dumps(metrics, default=_to_json).encode())
+
+    def GetOrCompute(
+        self, key: str, compute_fn: Callable[[], Dict[str, float]]
+    ) -> Dict[str, float]:
+        """Returns the cached metrics for key, computing and storing on a miss."""
+        metrics = self.Get(key)
+        if metrics is None:
+            metrics = compute_fn()
+            self.Put(key, metrics)
+        return metrics
+
+
+def cached_metrics(
+    cache: Optional[MetricsCache],
+    arrays: Sequence[np.ndarray],
+    config,
+    compute_fn: Callable[[], Dict[str, float]],
+) -> Dict[str, float]:
+    """Runs compute_fn, through cache under metrics_cache_key(arrays, config).
+
+    Arguments:
+      cache: MetricsCache, or None to always compute.
+      arrays: graph arrays the metrics depend on, see metrics_cache_key.
+      config: metric settings the values depend on, see metrics_cache_key.
+      compute_fn: computes the metrics dict.
+    Returns:
+      dict from metric names to metric values.
+    """
+    if cache is None:
+        return compute_fn()
+    return cache.GetOrCompute(metrics_cache_key(arrays, config), compute_fn)
+
+
+def metrics_cache_dir(output_path: str, cache_dir: Optional[str] = None) -> str:
+    """Returns cache_dir, or the default cache directory under output_path."""
+    return cache_dir or os.path.join(output_path, "metrics_cache")
@@ -11,17 +11,17 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import graph_tool
 import numpy as np
 
+from .graph_metrics_approx import hoeffding_error
+from .graph_summary import GraphSummary
 
-def edge_homogeneity(graph, labels):
-    count_in = 0
-    count_total = 0
-    for edge in graph.edges():
-        count_total += 1
-        count_in += labels[int(edge.source())] == labels[int(edge.target())]
-    return count_in / count_total
+
+def edge_homogeneity(graph, labels, summary=None):
+    edges = graph.get_edges() if summary is None else summary.edges
+    labels = np.asarray(labels)
+    count_in = int(np.count_nonzero(labels[edges[:, 0]] == labels[edges[:, 1]]))
+    return count_in / edges.shape[0]
 
 
 def sum_angular_distance_matrix_nan(X, Y, batch_size=100):
@@ -81,49 +81,116 @@ def feature_homogeneity(normed_features, labels):
     return in_avg, out_avg
 
 
-def _get_edge_count_matrix(adj, labels):
-    k = len(set(labels))
-    seen_edges = set()
-    edge_counts = np.zeros((k, k))
-    edge_matrix = np.array(np.nonzero(adj))
-    for edge_index in range(edge_matrix.shape[1]):
-        v1 = edge_matrix[0, edge_index]
-        v2 = edge_matrix[1, edge_index]
-        edge_tuple = (v1, v2)
-        if edge_tuple in seen_edges:
-            continue
-        else:
-            seen_edges.add(edge_tuple)
-        k1 = labels[v1]
-        k2 = labels[v2]
-        edge_counts[k1, k2] += 1
-        if k1 == k2:
-            edge_counts[k1, k2] += 1
-    edge_counts = edge_counts.astype(np.int32)
-    return edge_counts
+def _angular_similarity(dots):
+    sims = 1.0 - np.arccos(np.clip(dots, -1, 1)) / np.pi
+    sims[np.isnan(sims)] = 1.0
+    return sims
+
+
+def feature_homogeneity_blocked(
+    normed_features, labels, block_size=2048, dtype=np.float32
+):
+    """Computes feature_homogeneity with large BLAS tiles in reduced precision.
+
+    Only the upper block triangle of the similarity matrix is formed, one
+    (block_size, n - start) tile at a time, and same-label pairs are summed
+    with a label mask, so the cost is one pass over the n^2 / 2 pairs
+    regardless of the number of labels.
+
+    Args:
+      normed_features: (n, d) array of row-normalized features.
+      labels: (n,) int array of node labels.
+      block_size: rows per tile. Peak memory is block_size * n values.
+      dtype: dtype of the features and tiles.
+    Returns:
+      in_avg: average angular similarity of distinct same-label pairs.
+      out_avg: average angular similarity of all distinct pairs.
+    """
+    features = np.asarray(normed_features, dtype=dtype)
+    labels = np.asarray(labels)
+    n = features.shape[0]
+    total_sum = 0.0
+    in_sum = 0.0
+    for start in range(0, n, block_size):
+        end = min(start + block_size, n)
+        sims = _angular_similarity(features[start:end] @ features[start:].T)
+        same_label = labels[start:end, None] == labels[None, start:]
+        # The square part holds both orders of each pair; the rest one order.
+        square_sum = np.sum(sims[:, : end - start], dtype=np.float64)
+        rest_sum = np.sum(sims[:, end - start :], dtype=np.float64)
+        total_sum += square_sum + 2.0 * rest_sum
+        square_in = np.sum(sims[:, : end - start][same_label[:, : end - start]])
+        rest_in = np.sum(sims[:, end - start :][same_label[:, end - start :]])
+        in_sum += float(square_in) + 2.0 * float(rest_in)
+    # Drop the self-similarities of 1.0 and count each pair once.
+    total_sum = (total_sum - n) / 2.0
+    in_sum = (in_sum - n) / 2.0
+    label_sizes = np.unique(labels, return_counts=True)[1].astype(np.float64)
+    in_count = np.sum(label_sizes * (label_sizes - 1.0)) / 2.0
+    return in_sum / in_count, total_sum / (n * (n - 1.0) / 2.0)
+
+
+def feature_homogeneity_sampled(
+    normed_features, labels, num_samples=100000, confidence=0.95, seed=None
+):
+    """Estimates feature_homogeneity from uniformly sampled node pairs.
+
+    out_avg averages num_samples uniform distinct pairs; in_avg averages
+    num_samples uniform distinct same-label pairs (a label drawn in
+    proportion to its number of pairs, then two of its nodes). Similarities
+    lie in [0, 1], so by Hoeffding's inequality each estimate is within
+    sqrt(ln(2 / (1 - confidence)) / (2 * num_samples)) of feature_homogeneity
+    with probability at least confidence.
+
+    Args:
+      normed_features: (n, d) array of row-normalized features.
+      labels: (n,) int array of node labels.
+      num_samples: number of pairs drawn for each of the two averages.
+      confidence: coverage of the returned error bounds.
+      seed: seed of the sampling RNG. If None, fresh OS entropy is used.
+    Returns:
+      in_avg, out_avg: estimates of the feature_homogeneity outputs.
+      error: half-width of the confidence interval of both estimates.
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    n = normed_features.shape[0]
+
+    def mean_similarity(u, v):
+        dots = np.einsum("ij,ij->i", normed_features[u], normed_features[v])
+        return float(np.mean(_angular_similarity(dots)))
+
+    u = rng.integers(n, size=num_samples)
+    v = rng.integers(n - 1, size=num_samples)
+    v += v >= u
+    out_avg = mean_similarity(u, v)
+
+    # Nodes sorted by label; label c owns positions offsets[c]:offsets[c + 1].
+    order = np.argsort(labels, kind="stable")
+    _, label_sizes = np.unique(labels, return_counts=True)
+    offsets = np.concatenate([[0], np.cumsum(label_sizes)])
+    label_pairs = label_sizes * (label_sizes - 1.0)
+    label_index = rng.choice(
+        len(label_sizes), size=num_samples, p=label_pairs / np.sum(label_pairs)
+    )
+    sizes = label_sizes[label_index]
+    first = rng.integers(sizes)
+    second = rng.integers(sizes - 1)
+    second += second >= first
+    start = offsets[label_index]
+    in_avg = mean_similarity(order[start + first], order[start + second])
+
+    return in_avg, out_avg, hoeffding_error(num_samples, confidence)
 
 
 def matrix_row_norm(X):
     return X / np.linalg.norm(X, axis=1)[:, None]
 
 
-def _get_degrees_by_labels(labels, degrees, adjusted=False):
-    if adjusted:
-        degrees_by_labels = {
-            label: np.sum(degrees[np.where(labels == label)[0]]) for label in labels
-        }
-    else:
-        degrees_by_labels = {
-            label: len(np.where(labels == label)[0]) for label in labels
-        }
-    return degrees_by_labels
-
-
-def _get_p_to_q_ratio(G, labels, degrees, adjusted=False):
-    adj = graph_tool.spectral.adjacency(G)
-    edge_count_matrix = _get_edge_count_matrix(adj, labels)
-    pi = _get_pi(labels, degrees, adjusted)
-    n = adj.shape[0]
+def _get_p_to_q_ratio(summary, adjusted=False):
+    edge_count_matrix = summary.edge_count_matrix
+    pi = _get_pi(summary, adjusted)
+    n = summary.num_vertices
     num_within_pairs = np.sum(pi**2.0) * (n**2.0)
     num_between_pairs = (n**2.0) - num_within_pairs
     num_within_edges = np.sum(np.diag(edge_count_matrix))
@@ -140,19 +207,18 @@ def _get_pareto_exponent(degrees):
     return alpha
 
 
-def _get_pi(labels, degrees=None, adjusted=False):
-    label_counter = _get_degrees_by_labels(labels, degrees, adjusted)
-    sizes = np.array(sorted([v for v in label_counter.values()]))
+def _get_pi(summary, adjusted=False):
+    sizes = np.sort(summary.label_degrees if adjusted else summary.label_sizes)
     return sizes / np.sum(sizes)
 
 
-def _get_community_size_simpsons(labels):
-    pi = _get_pi(labels)
+def _get_community_size_simpsons(summary):
+    pi = _get_pi(summary)
     return np.sum(pi**2.0)
 
 
-def _get_num_clusters(labels):
-    pi = _get_pi(labels)
+def _get_num_clusters(summary):
+    pi = _get_pi(summary)
     return len(pi)
 
 
@@ -160,10 +226,69 @@ def _get_average_degree(degrees):
     return np.mean(degrees)
 
 
-def NodeLabelMetrics(graph, labels, features):
-    metrics = {"edge_homogeneity": edge_homogeneity(graph, labels)}
+_FEATURE_HOMOGENEITY_METHODS = ("exact", "blocked", "sampled")
+
+
+def check_feature_homogeneity_method(method, options=None):
+    """Raises ValueError for a NodeLabelMetrics method and options it rejects.
+
+    Args:
+      method: feature_homogeneity_method of NodeLabelMetrics.
+      options: feature_homogeneity_options of NodeLabelMetrics.
+    """
+    if method not in _FEATURE_HOMOGENEITY_METHODS:
+        raise ValueError(
+            "feature_homogeneity_method must be 'exact', 'blocked' or 'sampled'"
+        )
+    if method == "exact" and options:
+        raise ValueError(
+            "feature_homogeneity_method 'exact' takes no options, got %r; use "
+            "'blocked' or 'sampled' for feature_homogeneity_options" % (options,)
+        )
+
+
+def NodeLabelMetrics(
+    graph,
+    labels,
+    features,
+    feature_homogeneity_method="exact",
+    feature_homogeneity_options=None,
+    summary=None,
+):
+    """Computes label, feature and degree metrics of a labeled graph.
+
+    Args:
+      graph: graph_tool graph.
+      labels: (n,) int array of node labels.
+      features: (n, d) array of node features.
+      feature_homogeneity_method: "exact" (feature_homogeneity), "blocked"
+        (feature_homogeneity_blocked) or "sampled"
+        (feature_homogeneity_sampled). "sampled" also reports the error bound
+        of the two feature angular distances.
+      feature_homogeneity_options: dict of keyword arguments for the
+        "blocked" or "sampled" function; "exact" takes none.
+      summary: GraphSummary of graph and labels to reuse; built here if None.
+    Returns:
+      dict from metric names to metric values.
+    """
+    check_feature_homogeneity_method(
+        feature_homogeneity_method, feature_homogeneity_options
+    )
+    feature_homogeneity_options = feature_homogeneity_options or {}
+    if summary is None:
+        summary = GraphSummary(graph, labels)
+    metrics = {"edge_homogeneity": edge_homogeneity(graph, labels, summary)}
     normed_features = matrix_row_norm(features)
-    in_avg, out_avg = feature_homogeneity(normed_features, labels)
+    if feature_homogeneity_method == "exact":
+        in_avg, out_avg = feature_homogeneity(normed_features, labels)
+    elif feature_homogeneity_method == "blocked":
+        in_avg, out_avg = feature_homogeneity_blocked(
+            normed_features, labels, **feature_homogeneity_options
+        )
+    else:
+        in_avg, out_avg, error = feature_homogeneity_sampled(
+            normed_features, labels, **feature_homogeneity_options
+        )
     metrics.update(
         {
             "avg_in_feature_angular_distance": in_avg,
@@ -171,15 +296,15 @@ def NodeLabelMetrics(graph, labels, features):
             "feature_angular_snr": in_avg / out_avg,
         }
     )
-    degrees = graph.get_out_degrees(graph.get_vertices())
-    nonzero_degrees = np.array([d for d in degrees if d > 0])
+    if feature_homogeneity_method == "sampled":
+        metrics["feature_angular_distance_error"] = error
+    degrees = summary.degrees
+    nonzero_degrees = degrees[degrees > 0]
     metrics["pareto_exponent"] = _get_pareto_exponent(nonzero_degrees)
     metrics["avg_degree_est"] = _get_average_degree(degrees)
     if labels is not None:
-        metrics["community_size_simpsons"] = _get_community_size_simpsons(labels)
-        metrics["p_to_q_ratio_est"] = _get_p_to_q_ratio(graph, labels, degrees)
-        metrics["p_to_q_ratio__est_dc"] = _get_p_to_q_ratio(
-            graph, labels, degrees, adjusted=True
-        )
-        metrics["num_clusters"] = _get_num_clusters(labels)
+        metrics["community_size_simpsons"] = _get_community_size_simpsons(summary)
+        metrics["p_to_q_ratio_est"] = _get_p_to_q_ratio(summary)
+        metrics["p_to_q_ratio__est_dc"] = _get_p_to_q_ratio(summary, adjusted=True)
+        metrics["num_clusters"] = _get_num_clusters(summary)
     return metrics
@@ -25,8 +25,8 @@ from tqdm import tqdm
 
 from ..beam.benchmarker import BenchmarkGNNParDo
 from ..beam.generator_beam_handler import GeneratorBeamHandler
-from ..metrics.graph_metrics import graph_metrics
-from ..metrics.node_label_metrics import NodeLabelMetrics
+from ..generators.sbm_simulator import GetEdgeIndex, StochasticBlockModelBatch
+from ..metrics.labeled_graph_metrics import LabeledGraphMetricsDoFn
 from ..nodeclassification.utils import (
     get_label_masks,
     nodeclassification_data_to_torchgeo_data,
@@ -42,6 +42,19 @@ class SampleNodeClassificationDatasetDoFn(beam.DoFn):
         yield self._generator_wrapper.Generate(sample_id)
 
 
+def _SbmBatchToDglGraph(sbm_batch):
+    """Builds a batched DGL graph straight from a StochasticBlockModelBatch."""
+    edge_index = torch.from_numpy(sbm_batch.edge_index.astype(np.int64)).T
+    batch_graph = dgl.graph(
+        (edge_index[0], edge_index[1]),
+        num_nodes=int(sbm_batch.node_offsets[-1]),
+    )
+    batch_graph.ndata["feat"] = torch.from_numpy(sbm_batch.node_features)
+    batch_graph.set_batch_num_nodes(torch.from_numpy(np.diff(sbm_batch.node_offsets)))
+    batch_graph.set_batch_num_edges(torch.from_numpy(np.diff(sbm_batch.edge_offsets)))
+    return batch_graph
+
+
 class WriteNodeClassificationDatasetDoFn(beam.DoFn):
     def __init__(self, output_path):
         self._output_path = output_path
@@ -51,28 +64,31 @@ class WriteNodeClassificationDatasetDoFn(beam.DoFn):
         config = element["generator_config"]
         datas = element["data"]
         print("-----------------sample graph id", sample_id)
-        graphs = []
-        for data in tqdm(datas, desc="dump subgraph"):
-            edge_index = torch.tensor(data.graph.get_edges()).T
-            num_vertex = data.graph.num_vertices()
-            # num_edge = data.graph.num_edges()
-            node_feature = torch.tensor(data.node_features).float()
-
-            g = dgl.graph((edge_index[0], edge_index[1]), num_nodes=num_vertex)
-            g.ndata["feat"] = node_feature.to(torch.float)
-            graphs.append(g)
-
-            # print("num_vertex", num_vertex)
-            # print("node_feature.shape", node_feature.shape)
-            # print("num_edge", num_edge)
-            # print("edge_index.shape", edge_index.shape)
-        batch_graph = dgl.batch(graphs)
+        if isinstance(datas, StochasticBlockModelBatch):
+            batch_graph = _SbmBatchToDglGraph(datas)
+        else:
+            graphs = []
+            for data in tqdm(datas, desc="dump subgraph"):
+                edge_index = torch.tensor(GetEdgeIndex(data), dtype=torch.long).T
+                num_vertex = len(data.graph_memberships)
+                # num_edge = data.graph.num_edges()
+                node_feature = torch.tensor(data.node_features).float()
+
+                g = dgl.graph((edge_index[0], edge_index[1]), num_nodes=num_vertex)
+                g.ndata["feat"] = node_feature.to(torch.float)
+                graphs.append(g)
+
+                # print("num_vertex", num_vertex)
+                # print("node_feature.shape", node_feature.shape)
+                # print("num_edge", num_edge)
+                # print("edge_index.shape", edge_index.shape)
+            batch_graph = dgl.batch(graphs)
         bg_nodes = batch_graph.num_nodes()
         bg_edges = batch_graph.num_edges()
         max_degree = max(batch_graph.out_degrees()).item()
 
         print("num_vertex", bg_nodes)
-        print("node_feature.shape", g.ndata["feat"].shape)
+        print("node_feature.shape", batch_graph.ndata["feat"].shape)
         print("num_edge", bg_edges)
         print("max degree", max_degree)
 
@@ -139,19 +155,12 @@ class WriteNodeClassificationDatasetDoFn(beam.DoFn):
         #     f.close()
 
 
-class ComputeNodeClassificationMetrics(beam.DoFn):
+class ComputeNodeClassificationMetrics(LabeledGraphMetricsDoFn):
     def process(self, element):
         try:
             sample_id = element["sample_id"]
             out = element
-            out["metrics"] = graph_metrics(element["data"].graph)
-            out["metrics"].update(
-                NodeLabelMetrics(
-                    element["data"].graph,
-                    element["data"].graph_memberships,
-                    element["data"].node_features,
-                )
-            )
+            out["metrics"] = self.ComputeMetrics(element["data"])
         except:
             out["skipped"] = True
             print(
@@ -262,6 +271,12 @@ class NodeClassificationBeamHandler(GeneratorBeamHandler):
         num_train_per_class=20,
         num_val=500,
         save_tuning_results=False,
+        metrics_backend="networkx",
+        metrics_options=None,
+        feature_homogeneity_method="exact",
+        feature_homogeneity_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
     ):
         self._sample_do_fn = SampleNodeClassificationDatasetDoFn(generator_wrapper)
         self._benchmark_par_do = BenchmarkGNNParDo(
@@ -271,7 +286,14 @@ class NodeClassificationBeamHandler(GeneratorBeamHandler):
             tuning_metric_is_loss,
             save_tuning_results,
         )
-        self._metrics_par_do = ComputeNodeClassificationMetrics()
+        self._metrics_par_do = ComputeNodeClassificationMetrics(
+            metrics_backend,
+            metrics_options,
+            feature_homogeneity_method,
+            feature_homogeneity_options,
+            cache_metrics,
+            metrics_cache_dir,
+        )
         self._num_train_per_class = num_train_per_class
         self._num_val = num_val
         self._save_tuning_results = save_tuning_results
@@ -298,3 +320,4 @@ class NodeClassificationBeamHandler(GeneratorBeamHandler):
         #     output_path, self._num_train_per_class, self._num_val
         # )
         self._benchmark_par_do.SetOutputPath(output_path)
+        self._metrics_par_do.SetOutputPath(output_path)
@@ -18,8 +18,11 @@ import numpy as np
 
 from ..beam.generator_config_sampler import GeneratorConfigSampler
 from ..generators.cabam_simulator import GenerateCABAMGraphWithFeatures
+from ..generators.lfr_feasibility import LFRFeasibilityCache
 from ..generators.lfr_simulator import GenerateLFRGraphWithFeatures, SimulateLFRWrapper
+from ..generators.random_utils import MakeRng, MakeSeedSequence
 from ..generators.sbm_simulator import (
+    GenerateStochasticBlockModelBatch,
     GenerateStochasticBlockModelWithFeatures,
     MakeDegrees,
     MakePi,
@@ -38,10 +41,18 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
         normalize_features=True,
         use_generated_lfr_communities=False,
         lfr_params=None,
+        num_workers=1,
+        seed=None,
+        sbm_backend="graph_tool",
+        batched=False,
     ):
         super(SbmGeneratorWrapper, self).__init__(param_sampler_specs)
         self._marginal = marginal
         self._normalize_features = normalize_features
+        self._num_workers = num_workers
+        self._seed = seed
+        self._sbm_backend = sbm_backend
+        self._batched = batched
         self._use_generated_lfr_communities = use_generated_lfr_communities
         self._lfr_params = lfr_params
         self._AddSamplerFn("nvertex", self._SampleUniformInteger)
@@ -97,8 +108,9 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
         # a custom container. The import will execute once then the sys.modeules
         # will be referenced to further calls.
 
+        rng = None if self._seed is None else MakeRng(self._seed, sample_id)
         generator_config, marginal_param, fixed_params = self.SampleConfig(
-            self._marginal
+            self._marginal, rng=rng
         )
         generator_config["generator_name"] = "StochasticBlockModel"
 
@@ -121,6 +133,7 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
                 ),
                 generator_config["community_power_exponent"],
                 self._lfr_params["mixing_param"].default_val,
+                rng=rng,
             )
             if lfr_model is None:
                 return {
@@ -142,25 +155,48 @@ class SbmGeneratorWrapper(GeneratorConfigSampler):
         prop_mat = MakePropMat(
             generator_config["num_clusters"], generator_config["p_to_q_ratio"]
         )
-        sbm_data = GenerateStochasticBlockModelWithFeatures(
-            num_graphs=4096,
-            num_vertices=generator_config["nvertex"],
-            num_edges=generator_config["nvertex"] * generator_config["avg_degree"],
-            pi=pi,
-            prop_mat=prop_mat,
-            num_feature_groups=generator_config["num_clusters"],
-            feature_group_match_type=MatchType.GROUPED,
-            feature_center_distance=generator_config["feature_center_distance"],
-            feature_dim=generator_config["feature_dim"],
-            edge_center_distance=generator_config["edge_center_distance"],
-            edge_feature_dim=generator_config["edge_feature_dim"],
-            out_degs=MakeDegrees(
-                generator_config["power_exponent"],
-                generator_config["min_deg"],
-                generator_config["nvertex"],
-            ),
-            normalize_features=self._normalize_features,
-        )
+        if self._batched:
+            sbm_data = GenerateStochasticBlockModelBatch(
+                num_graphs=4096,
+                num_vertices=generator_config["nvertex"],
+                num_edges=generator_config["nvertex"] * generator_config["avg_degree"],
+                pi=pi,
+                prop_mat=prop_mat,
+                out_degs=MakeDegrees(
+                    generator_config["power_exponent"],
+                    generator_config["min_deg"],
+                    generator_config["nvertex"],
+                    rng=rng,
+                ),
+                feature_dim=generator_config["feature_dim"],
+                rng=rng,
+            )
+        else:
+            sbm_data = GenerateStochasticBlockModelWithFeatures(
+                num_graphs=4096,
+                num_vertices=generator_config["nvertex"],
+                num_edges=generator_config["nvertex"] * generator_config["avg_degree"],
+                pi=pi,
+                prop_mat=prop_mat,
+                num_feature_groups=generator_config["num_clusters"],
+                feature_group_match_type=MatchType.GROUPED,
+                feature_center_distance=generator_config["feature_center_distance"],
+                feature_dim=generator_config["feature_dim"],
+                edge_center_distance=generator_config["edge_center_distance"],
+                edge_feature_dim=generator_config["edge_feature_dim"],
+                out_degs=MakeDegrees(
+                    generator_config["power_exponent"],
+                    generator_config["min_deg"],
+                    generator_config["nvertex"],
+                    rng=rng,
+                ),
+                normalize_features=self._normalize_features,
+                num_workers=self._num_workers,
+                seed=None
+                if self._seed is None
+                else MakeSeedSequence(self._seed, sample_id),
+                sbm_backend=self._sbm_backend,
+            )
 
         # return {'sample_id': sample_id,
         #         'marginal_param': marginal_param,
@@ -190,9 +226,11 @@ class CABAMGeneratorWrapper(GeneratorConfigSampler):
         normalize_features=False,
         use_generated_lfr_communities=False,
         lfr_params=None,
+        seed=None,
     ):
         super(CABAMGeneratorWrapper, self).__init__(param_sampler_specs)
         self._marginal = marginal
+        self._seed = seed
         self._normalize_features = normalize_features
         self._use_generated_lfr_communities = use_generated_lfr_communities
         self._lfr_params = lfr_params
@@ -212,8 +250,9 @@ class CABAMGeneratorWrapper(GeneratorConfigSampler):
 
     def Generate(self, sample_id):
         """Sample and save CABAM outputs given a configuration filepath."""
+        rng = None if self._seed is None else MakeRng(self._seed, sample_id)
         generator_config, marginal_param, fixed_params = self.SampleConfig(
-            self._marginal
+            self._marginal, rng=rng
         )
         generator_config["generator_name"] = "CABAM"
 
@@ -236,6 +275,7 @@ class CABAMGeneratorWrapper(GeneratorConfigSampler):
                 ),
                 generator_config["community_power_exponent"],
                 self._lfr_params["mixing_param"].default_val,
+                rng=rng,
             )
             if lfr_model is None:
                 return {
@@ -268,6 +308,7 @@ class CABAMGeneratorWrapper(GeneratorConfigSampler):
             temperature=generator_config["temperature"],
             edge_center_distance=generator_config["edge_center_distance"],
             edge_feature_dim=generator_config["edge_feature_dim"],
+            rng=rng,
         )
 
         # return {'sample_id': sample_id,
@@ -292,10 +333,25 @@ class CABAMGeneratorWrapper(GeneratorConfigSampler):
 @gin.configurable
 class LFRGeneratorWrapper(GeneratorConfigSampler):
     def __init__(
-        self, param_sampler_specs, marginal=False, normalize_features=True, num_tries=20
+        self,
+        param_sampler_specs,
+        marginal=False,
+        normalize_features=True,
+        num_tries=20,
+        seed=None,
+        num_parallel_tries=1,
+        check_feasibility=False,
+        feasibility_cache_path=None,
+        max_resamples=100,
     ):
         super(LFRGeneratorWrapper, self).__init__(param_sampler_specs)
         self._marginal = marginal
+        self._seed = seed
+        self._num_parallel_tries = num_parallel_tries
+        self._max_resamples = max_resamples
+        self._feasibility_cache = None
+        if check_feasibility:
+            self._feasibility_cache = LFRFeasibilityCache(feasibility_cache_path)
         self._normalize_features = normalize_features
         self._num_tries = num_tries
         self._AddSamplerFn("nvertex", self._SampleUniformInteger)
@@ -311,40 +367,53 @@ class LFRGeneratorWrapper(GeneratorConfigSampler):
         self._AddSamplerFn("edge_feature_dim", self._SampleUniformInteger)
         self._AddSamplerFn("edge_center_distance", self._SampleUniformFloat)
 
+    @staticmethod
+    def _LFRParams(generator_config):
+        # SimulateLFR positional arguments for a sampled config.
+        n = generator_config["nvertex"]
+        return (
+            n,
+            generator_config["avg_degree"],
+            int(generator_config["max_degree_proportion"] * n),
+            generator_config["power_exponent"],
+            int(generator_config["community_min_size_proportion"] * n),
+            int(generator_config["community_max_size_proportion"] * n),
+            generator_config["community_power_exponent"],
+            generator_config["mixing_param"],
+        )
+
+    def _IsFeasible(self, generator_config):
+        return self._feasibility_cache.IsFeasible(*self._LFRParams(generator_config))
+
     def Generate(self, sample_id):
         """
         Sample and save LFR outputs given a configuration filepath.
         """
-        generator_config, marginal_param, fixed_params = self.SampleConfig(
-            self._marginal
-        )
+        rng = None if self._seed is None else MakeRng(self._seed, sample_id)
+        if self._feasibility_cache is None:
+            generator_config, marginal_param, fixed_params = self.SampleConfig(
+                self._marginal, rng=rng
+            )
+        else:
+            generator_config, marginal_param, fixed_params = self.SampleConfig(
+                self._marginal,
+                rng=rng,
+                config_filter=self._IsFeasible,
+                max_resamples=self._max_resamples,
+            )
         generator_config["generator_name"] = "LFR"
+        lfr_params = self._LFRParams(generator_config)
 
-        lfr_data = GenerateLFRGraphWithFeatures(
-            n=generator_config["nvertex"],
-            avg_deg=generator_config["avg_degree"],
-            max_deg=int(
-                generator_config["max_degree_proportion"] * generator_config["nvertex"]
-            ),
-            exponent=generator_config["power_exponent"],
-            min_community_size=int(
-                generator_config["community_min_size_proportion"]
-                * generator_config["nvertex"]
-            ),
-            max_community_size=int(
-                generator_config["community_max_size_proportion"]
-                * generator_config["nvertex"]
-            ),
-            community_exponent=generator_config["community_power_exponent"],
-            mixing_param=generator_config["mixing_param"],
-            feature_group_match_type=MatchType.GROUPED,
-            feature_center_distance=generator_config["feature_center_distance"],
-            feature_dim=generator_config["feature_dim"],
-            edge_center_distance=generator_config["edge_center_distance"],
-            edge_feature_dim=generator_config["edge_feature_dim"],
-            normalize_features=self._normalize_features,
-            num_tries=self._num_tries,
-        )
+        if self._feasibility_cache is not None and not self._IsFeasible(
+            generator_config
+        ):
+            print(f"LFR config rejected as infeasible: {lfr_params}")
+            lfr_data = None
+        else:
+            lfr_data = self._GenerateLFR(generator_config, lfr_params, rng)
+            if self._feasibility_cache is not None:
+                self._feasibility_cache.Record(lfr_data is not None, *lfr_params)
+                self._feasibility_cache.Save()
 
         if lfr_data:
             data = NodeClassificationDataset(
@@ -364,3 +433,25 @@ class LFRGeneratorWrapper(GeneratorConfigSampler):
             "generator_config": generator_config,
             "data": data,
         }
+
+    def _GenerateLFR(self, generator_config, lfr_params, rng):
+        n, avg_deg, max_deg, exponent, min_size, max_size, size_exp, mu = lfr_params
+        return GenerateLFRGraphWithFeatures(
+            n=n,
+            avg_deg=avg_deg,
+            max_deg=max_deg,
+            exponent=exponent,
+            min_community_size=min_size,
+            max_community_size=max_size,
+            community_exponent=size_exp,
+            mixing_param=mu,
+            feature_group_match_type=MatchType.GROUPED,
+            feature_center_distance=generator_config["feature_center_distance"],
+            feature_dim=generator_config["feature_dim"],
+            edge_center_distance=generator_config["edge_center_distance"],
+            edge_feature_dim=generator_config["edge_feature_dim"],
+            normalize_features=self._normalize_features,
+            num_tries=self._num_tries,
+            rng=rng,
+            num_parallel_tries=self._num_parallel_tries,
+        )
@@ -17,7 +17,7 @@ import dataclasses
 import enum
 import math
 import random
-from typing import Dict, List, Optional, Sequence, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import graph_tool
 
@@ -27,6 +27,8 @@ import torch
 from torch_geometric.data import Data
 from torch_geometric.utils import from_networkx
 
+from ..generators.sbm_simulator import BidirectionalEdgeFeatures
+
 
 @dataclasses.dataclass
 class NodeClassificationDataset:
@@ -37,29 +39,23 @@ class NodeClassificationDataset:
       node_features: numpy array of node features.
       feature_memberships: list of integer node feature classes.
       edge_features: map from edge tuple to numpy array. Only stores undirected
-        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be.
+        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be. May
+        instead be a (num_edges, dim) array aligned with graph.get_edges().
     """
 
     graph: graph_tool.Graph = Ellipsis
     graph_memberships: np.ndarray = Ellipsis
     node_features: np.ndarray = Ellipsis
     feature_memberships: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
 
 
 def nodeclassification_data_to_torchgeo_data(
     nodeclassification_data: NodeClassificationDataset,
 ) -> Data:
-    edge_tuples = []
-    edge_feature_data = []
-    for edge in nodeclassification_data.graph.iter_edges():
-        edge_tuples.append([edge[0], edge[1]])
-        edge_tuples.append([edge[1], edge[0]])
-        ordered_tuple = (edge[0], edge[1])
-        if edge[0] > edge[1]:
-            ordered_tuple = (edge[1], edge[0])
-        edge_feature_data.append(nodeclassification_data.edge_features[ordered_tuple])
-        edge_feature_data.append(nodeclassification_data.edge_features[ordered_tuple])
+    edge_tuples, edge_feature_data = BidirectionalEdgeFeatures(
+        nodeclassification_data.graph, nodeclassification_data.edge_features
+    )
 
     node_features = torch.tensor(
         nodeclassification_data.node_features, dtype=torch.float
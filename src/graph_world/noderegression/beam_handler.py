@@ -22,8 +22,7 @@ import numpy as np
 
 from ..beam.benchmarker import Benchmarker, BenchmarkGNNParDo
 from ..beam.generator_beam_handler import GeneratorBeamHandler
-from ..metrics.graph_metrics import graph_metrics
-from ..metrics.node_label_metrics import NodeLabelMetrics
+from ..metrics.labeled_graph_metrics import LabeledGraphMetricsDoFn
 from ..noderegression.utils import noderegression_data_to_torchgeo_data, sample_masks
 
 
@@ -100,17 +99,10 @@ class WriteNodeRegressionDatasetDoFn(beam.DoFn):
             f.close()
 
 
-class ComputeNodeRegressionGraphMetrics(beam.DoFn):
+class ComputeNodeRegressionGraphMetrics(LabeledGraphMetricsDoFn):
     def process(self, element):
         out = element
-        out["metrics"] = graph_metrics(element["data"].graph)
-        out["metrics"].update(
-            NodeLabelMetrics(
-                element["data"].graph,
-                element["data"].graph_memberships,
-                element["data"].node_features,
-            )
-        )
+        out["metrics"] = self.ComputeMetrics(element["data"])
         yield out
 
 
@@ -170,6 +162,12 @@ class NodeRegressionBeamHandler(GeneratorBeamHandler):
         tuning_metric="",
         tuning_metric_is_loss=False,
         save_tuning_results=False,
+        metrics_backend="networkx",
+        metrics_options=None,
+        feature_homogeneity_method="exact",
+        feature_homogeneity_options=None,
+        cache_metrics=False,
+        metrics_cache_dir=None,
     ):
         self._sample_do_fn = SampleNodeRegressionDatasetDoFn(generator_wrapper)
         self._benchmark_par_do = BenchmarkGNNParDo(
@@ -179,7 +177,14 @@ class NodeRegressionBeamHandler(GeneratorBeamHandler):
             tuning_metric_is_loss,
             save_tuning_results,
         )
-        self._metrics_par_do = ComputeNodeRegressionGraphMetrics()
+        self._metrics_par_do = ComputeNodeRegressionGraphMetrics(
+            metrics_backend,
+            metrics_options,
+            feature_homogeneity_method,
+            feature_homogeneity_options,
+            cache_metrics,
+            metrics_cache_dir,
+        )
         self._training_ratio = training_ratio
         self._tuning_ratio = tuning_ratio
         self._save_tuning_results = save_tuning_results
@@ -206,3 +211,4 @@ class NodeRegressionBeamHandler(GeneratorBeamHandler):
             self._training_ratio, self._tuning_ratio
         )
         self._benchmark_par_do.SetOutputPath(output_path)
+        self._metrics_par_do.SetOutputPath(output_path)
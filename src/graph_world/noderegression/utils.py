@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import dataclasses
-from typing import Dict, Tuple
+from typing import Dict, Tuple, Union
 
 import graph_tool
 
@@ -22,6 +22,8 @@ import torch
 from sklearn.preprocessing import StandardScaler
 from torch_geometric.data import Data
 
+from ..generators.sbm_simulator import BidirectionalEdgeFeatures
+
 
 @dataclasses.dataclass
 class NodeRegressionDataset:
@@ -31,7 +33,8 @@ class NodeRegressionDataset:
       node_regression_target: numpy array of float-castable regression targets.
       node_features: numpy array of node features.
       edge_features: map from edge tuple to numpy array. Only stores undirected
-        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be.
+        edges, i.e. (0, 1) will be in the map, but (1, 0) will not be. May
+        instead be a (num_edges, dim) array aligned with graph.get_edges().
       graph_memberships: list of integer node classes. This is optional for many
         node regression tasks, but if the generator for the task is some cluster
         model (such as the SBM), it may be useful to store class information for
@@ -41,7 +44,7 @@ class NodeRegressionDataset:
     graph: graph_tool.Graph = Ellipsis
     node_regression_target: np.ndarray = Ellipsis
     node_features: np.ndarray = Ellipsis
-    edge_features: Dict[Tuple[int, int], np.ndarray] = Ellipsis
+    edge_features: Union[Dict[Tuple[int, int], np.ndarray], np.ndarray] = Ellipsis
     graph_memberships: np.ndarray = Ellipsis
 
 
@@ -79,16 +82,9 @@ def calculate_target(graph: graph_tool.Graph, target: str) -> np.ndarray:
 def noderegression_data_to_torchgeo_data(
     noderegression_data: NodeRegressionDataset,
 ) -> Data:
-    edge_tuples = []
-    edge_feature_data = []
-    for edge in noderegression_data.graph.iter_edges():
-        edge_tuples.append([edge[0], edge[1]])
-        edge_tuples.append([edge[1], edge[0]])
-        ordered_tuple = (edge[0], edge[1])
-        if edge[0] > edge[1]:
-            ordered_tuple = (edge[1], edge[0])
-        edge_feature_data.append(noderegression_data.edge_features[ordered_tuple])
-        edge_feature_data.append(noderegression_data.edge_features[ordered_tuple])
+    edge_tuples, _ = BidirectionalEdgeFeatures(
+        noderegression_data.graph, noderegression_data.edge_features
+    )
 
     node_features = torch.tensor(noderegression_data.node_features, dtype=torch.float)
     edge_index = torch.tensor(edge_tuples, dtype=torch.long)